@@ -44,6 +44,13 @@ def test_setting_changed_handler(**kwargs):
     elif kwargs['setting'].startswith('AVOCADO_'):
         key = kwargs['setting'][8:]
         value = kwargs['value']
+
+        # The setting is unset when the override ends, so the configured
+        # or default value is restored rather than None.
+        if value is None and not kwargs.get('enter', True):
+            value = getattr(django_settings, 'AVOCADO', {}).get(
+                key, getattr(global_settings, key, None))
+
         setattr(settings._wrapped, key, value)
 
 
@@ -149,12 +156,64 @@ class Guardian(Dependency):
             return False
 
 
+class Numpy(Dependency):
+    """The statistics package uses NumPy for vectorized computations, such
+    as k-means clustering, when it is installed. Otherwise, the slower
+    pure-Python implementations are used.
+
+    Install by doing `pip install numpy`.
+    """
+
+    name = 'numpy'
+
+    def test_install(self):
+        try:
+            import numpy        # noqa
+        except ImportError:
+            return False
+
+
+class Pyarrow(Dependency):
+    """The Parquet exporter uses pyarrow to write typed, columnar output
+    that can be read directly by analysis tools.
+
+    Install by doing `pip install pyarrow`.
+    """
+
+    name = 'pyarrow'
+
+    def test_install(self):
+        try:
+            import pyarrow      # noqa
+        except ImportError:
+            return False
+
+
+class Zstandard(Dependency):
+    """Exporters that support compression can stream their output through
+    Zstandard, which compresses faster and smaller than gzip.
+
+    Install by doing `pip install zstandard`.
+    """
+
+    name = 'zstandard'
+
+    def test_install(self):
+        try:
+            import zstandard    # noqa
+        except ImportError:
+            return False
+
+
 # Keep track of the officially supported apps and libraries used for various
 # features.
 OPTIONAL_DEPS = {
     'haystack': Haystack(),
     'openpyxl': Openpyxl(),
     'guardian': Guardian(),
+    'numpy': Numpy(),
+    'pyarrow': Pyarrow(),
+    'zstandard': Zstandard(),
 }
 
 
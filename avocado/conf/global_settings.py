@@ -92,6 +92,27 @@ QUERY_PROCESSORS = {
     'default': 'avocado.query.pipeline.QueryProcessor',
 }
 
+# The number of rows fetched per round trip when streaming query results
+# from a server-side cursor, e.g. `QueryProcessor.get_iterable(stream=True)`.
+STREAM_FETCH_SIZE = 2000
+
+# Maximum number of parsed contexts and views kept in a process-local cache,
+# so repeated queries for the same tree skip resolving the referenced fields
+# and translating the conditions. Each lookup, including a hit, still runs a
+# query for the modified times and data versions of the referenced fields or
+# concepts, so changes made in other processes are picked up. Set to 0 (or
+# None) to disable the cache.
+QUERY_PARSE_CACHE_SIZE = 500
+
+# Toggle whether the counts of queries built from contexts are cached in the
+# `QUERY_CACHE`. Counts are keyed by the SQL of the query and invalidated when
+# the data epoch is incremented by `avocado data --incr`. Other changes to the
+# data are only reflected once a count expires after
+# `QUERY_COUNT_CACHE_TIMEOUT` seconds, so this is disabled by default and
+# should only be enabled if the data is loaded with `avocado data --incr`.
+QUERY_COUNT_CACHE_ENABLED = False
+QUERY_COUNT_CACHE_TIMEOUT = 60 * 10
+
 # Custom validation error and warnings messages
 VALIDATION_ERRORS = {}
 VALIDATION_WARNINGS = {}
@@ -100,6 +121,15 @@ VALIDATION_WARNINGS = {}
 # for their most common data access methods.
 DATA_CACHE_ENABLED = True
 
+# Maximum number of entries kept in a process-local cache in front of the
+# `DATA_CACHE` backend. This avoids a round trip to the backend for data
+# that is read repeatedly, such as `DataField.values()`. Cached objects are
+# shared rather than copied and entries expire after `DATA_CACHE_L1_TIMEOUT`
+# seconds since other processes may change the backend in the meantime.
+# Set to 0 (or None) to disable the local cache.
+DATA_CACHE_L1_SIZE = 0
+DATA_CACHE_L1_TIMEOUT = 60
+
 # These settings affect how queries can be shared between users.
 # A user is able to enter either a username or an email of another user
 # they wish to share the query with. To limit to only one type of sharing
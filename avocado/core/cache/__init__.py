@@ -1,5 +1,7 @@
 from .model import cache_key, instance_cache_key, cached_method  # noqa
 from .receivers import post_save_cache, pre_delete_uncache  # noqa
 from .managers import CacheManager  # noqa
-from .query import CacheQuerySet  # noqa
+from .query import CacheQuerySet, cached_count  # noqa
+from .query import get_data_epoch, incr_data_epoch  # noqa
 from .proxy import CacheProxy  # noqa
+from .memo import FieldMemo  # noqa
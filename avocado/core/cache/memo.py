@@ -0,0 +1,40 @@
+import threading
+from avocado.conf import settings
+
+
+class FieldMemo(object):
+    """Process-local memo of a value built from the data of a field, keyed by
+    the field's primary key. Entries hold the `data_version` and modified time
+    of the field they were built for, so a bump of the version or a change to
+    the field causes the value to be rebuilt.
+
+    Values are only memoized when the data cache is enabled. Otherwise, and
+    for unsaved fields which cannot be keyed, they are built on every call.
+    """
+    def __init__(self, build):
+        self.build = build
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, field):
+        if not settings.DATA_CACHE_ENABLED or field.pk is None:
+            return self.build(field)
+
+        version = (field.data_version, field.modified)
+
+        with self._lock:
+            entry = self._entries.get(field.pk)
+
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        value = self.build(field)
+
+        with self._lock:
+            self._entries[field.pk] = (version, value)
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -13,17 +13,35 @@ NEVER_EXPIRE = 60 * 60 * 24 * 30  # 30 days
 logger = logging.getLogger(__name__)
 
 
+def _queryset_sql(queryset):
+    """Returns the SQL of the queryset.
+
+    The SQL is memoized on the queryset object since compiling is the most
+    expensive part of deriving a key. Querysets are cloned when filtered,
+    so the memoized SQL does not go stale.
+    """
+    try:
+        return queryset._cache_key_sql
+    except AttributeError:
+        pass
+
+    # Compile the query and use the SQL string as the key value.
+    # Microbenchmarking shows this is faster than pickling and then
+    # hashing the query's internal dict. In addition, the variability
+    # in SQL queries vs. the internal structure of query across Django
+    # versions is at most the same if not less variable.
+    s, p = queryset.query.get_compiler(queryset.db).as_sql()
+    sql = s % p
+
+    queryset._cache_key_sql = sql
+
+    return sql
+
+
 def _pickling_value(v):
     "Returns an appropriate value to be pickled."
     if isinstance(v, QuerySet):
-        # Compile the query and use the SQL string as the pickle value.
-        # Microbenchmarking shows this is faster than pickling and then
-        # hashing the query's internal dict. In addition, the variability
-        # in SQL queries vs. the internal structure of query across Django
-        # versions is at most the same if not less variable.
-        s, p = v.query.get_compiler(v.db).as_sql()
-
-        return s % p
+        return _queryset_sql(v)
 
     if inspect.isclass(v) and not hasattr(v, '__getstate__'):
         # As with the QuerySet instance above, this could result in loading
@@ -34,25 +52,52 @@ def _pickling_value(v):
     return v
 
 
-def _prep_pickling(args, kwargs):
-    "Prepares the positional and keyword arguments for pickling."
-    if args:
-        args = [_pickling_value(v) for v in args]
-    else:
-        args = None
+# Types whose repr is stable across processes and unambiguous, so it can be
+# used in a key as is.
+REPR_TYPES = (str, unicode, int, long, float, bool, type(None))
+
+
+def _key_value(v):
+    "Returns a string representing the structure and value of `v`."
+    t = type(v)
+
+    if t in REPR_TYPES:
+        return repr(v)
 
-    _kwargs = {}
+    if t is tuple:
+        return '(' + ','.join([_key_value(x) for x in v]) + ')'
+
+    if t is list:
+        return '[' + ','.join([_key_value(x) for x in v]) + ']'
+
+    if t is dict:
+        return '{' + ','.join(sorted([
+            _key_value(k) + ':' + _key_value(x) for k, x in v.iteritems()
+        ])) + '}'
+
+    if isinstance(v, QuerySet):
+        return 'sql:' + _queryset_sql(v)
+
+    # Fallback to the pickled value for everything else.
+    return 'pickle:' + pickle.dumps(_pickling_value(v))
+
+
+def _arguments_key(args, kwargs):
+    """Returns a string representing the positional and keyword arguments.
+    Keyword arguments that are None are ignored.
+    """
+    parts = []
+
+    if args:
+        parts.append(_key_value(tuple(args)))
 
     if kwargs:
-        for k, v in kwargs.items():
-            if v is not None:
-                _kwargs[k] = _pickling_value(v)
+        items = [(k, v) for k, v in kwargs.iteritems() if v is not None]
 
-        kwargs = _kwargs or None
-    else:
-        kwargs = None
+        if items:
+            parts.append(_key_value(dict(items)))
 
-    return args, kwargs
+    return ';'.join(parts)
 
 
 def cache_key_func(l):
@@ -61,31 +106,37 @@ def cache_key_func(l):
     return hashlib.sha256(raw).hexdigest()
 
 
-def cache_key(label, version=None, args=None, kwargs=None):
-    """Creates a cache key given label and optional version.
-
-    In addition, arbitrary arguments and keyword arguments may be passed that
-    will be pickled prior to being included in the cache key. This is useful
-    for caching return values from functions that take arguments.
-    """
-    if not label:
-        raise ValueError('cache label cannot be empty')
-
+def _versioned_key(key, version, args, kwargs):
     if version is None:
         version = '-'
     elif callable(version):
         version = version()
 
-    key = [label, version]
-
-    args, kwargs = _prep_pickling(args, kwargs)
+    key.append(version)
 
+    # Fast path for the common case of no arguments.
     if args or kwargs:
-        key.append(pickle.dumps((args, kwargs)))
+        arguments = _arguments_key(args, kwargs)
+
+        if arguments:
+            key.append(arguments)
 
     return cache_key_func(key)
 
 
+def cache_key(label, version=None, args=None, kwargs=None):
+    """Creates a cache key given label and optional version.
+
+    In addition, arbitrary arguments and keyword arguments may be passed that
+    will be included in the cache key. This is useful for caching return
+    values from functions that take arguments.
+    """
+    if not label:
+        raise ValueError('cache label cannot be empty')
+
+    return _versioned_key([label], version, args, kwargs)
+
+
 def instance_cache_key(instance, label=None, version=None, args=None,
                        kwargs=None):
     """Extends the base `cache_key` function to include model instance metadata
@@ -113,19 +164,26 @@ def instance_cache_key(instance, label=None, version=None, args=None,
     if label is not None:
         key.append(label)
 
-    label = cache_key_func(key)
-
-    return cache_key(label=label, version=version, args=args, kwargs=kwargs)
+    # The instance metadata and the rest of the key are hashed at once.
+    return _versioned_key(key, version, args, kwargs)
 
 
 def cached_method(func=None, version=None, timeout=NEVER_EXPIRE,
-                  key_func=instance_cache_key):
-    "Wraps a model instance method and caches the output indefinitely."
+                  key_func=instance_cache_key, single_flight=False,
+                  stale_timeout=None):
+    """Wraps a model instance method and caches the output indefinitely.
+
+    If `single_flight` is true, only one process recomputes the output on a
+    miss. The others use the previous output for up to `stale_timeout`
+    seconds after it was computed or wait for the new output.
+    """
 
     def decorator(func):
         # Single cache proxy shared across all instances. All methods require
         # the instance to be passed.
-        cache_proxy = CacheProxy(func, version, timeout, key_func)
+        cache_proxy = CacheProxy(func, version, timeout, key_func,
+                                 single_flight=single_flight,
+                                 stale_timeout=stale_timeout)
 
         @wraps(func)
         def inner(self, *args, **kwargs):
@@ -149,6 +207,8 @@ def cached_method(func=None, version=None, timeout=NEVER_EXPIRE,
         inner.flush = flush
         inner.cached = cached
         inner.cache_key = cache_key
+        inner.stats = cache_proxy.stats
+        inner.cache_proxy = cache_proxy
 
         return inner
 
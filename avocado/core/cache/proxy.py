@@ -1,53 +1,266 @@
+import time
 import logging
 from django.core.cache import get_cache
 from avocado.conf import settings
+from avocado.core.structures import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Process-local cache shared by all proxies. It is created on first use
+# and rebuilt if the `DATA_CACHE_L1_SIZE` setting changes.
+_local_cache = None
+
+
+def get_local_cache():
+    "Returns the process-local cache or None if it is disabled."
+    global _local_cache
+
+    size = settings.DATA_CACHE_L1_SIZE
+
+    if not size:
+        return
+
+    if _local_cache is None or _local_cache.maxsize != size:
+        _local_cache = LRUCache(maxsize=size)
+
+    return _local_cache
+
+
+def get_many(items):
+    """Takes a list of (proxy, key) pairs and returns a dict of the cached
+    data by key. The backend is hit once for the keys missing from the
+    process-local cache.
+    """
+    found = {}
+    missing = []
+
+    for proxy, key in items:
+        data = proxy._local_get(key)
+
+        if data is None:
+            missing.append((proxy, key))
+        else:
+            found[key] = data
+
+    if missing:
+        cache = get_cache(settings.DATA_CACHE)
+        cached = cache.get_many([key for _, key in missing])
+
+        for proxy, key in missing:
+            data = cached.get(key)
+
+            if data is not None:
+                proxy._local_set(key, data)
+                found[key] = data
+
+    return found
+
+
+def set_many(items):
+    """Takes a list of (proxy, key, data) tuples and sets the data in the
+    cache. Keys are set in one call per distinct proxy timeout.
+    """
+    timeouts = {}
+
+    for proxy, key, data in items:
+        if data is None:
+            continue
+
+        timeouts.setdefault(proxy.timeout, {})[key] = data
+        proxy._local_set(key, data)
+
+    cache = get_cache(settings.DATA_CACHE)
+
+    for timeout, data in timeouts.items():
+        cache.set_many(data, timeout=timeout)
+        logger.debug('Set {0} property caches'.format(len(data)))
+
 
 class CacheProxy(object):
-    def __init__(self, func, version, timeout, key_func):
+    # Number of seconds a recompute lock is held before it expires in case
+    # the process holding it dies.
+    lock_timeout = 60
+
+    # Number of seconds to wait for another process to finish computing
+    # the data before computing it regardless and the polling interval.
+    wait_timeout = 10
+    wait_interval = 0.1
+
+    def __init__(self, func, version, timeout, key_func, single_flight=False,
+                 stale_timeout=None):
         self.func = func
         self.label = func.__name__
         self.version = version
         self.timeout = timeout
         self.key_func = key_func
 
+        # If true, only one process computes the data on a miss while the
+        # others wait for it or use the stale data, if available. Stale data
+        # is the last computed data regardless of version and is kept for
+        # `stale_timeout` seconds.
+        self.single_flight = single_flight
+        self.stale_timeout = stale_timeout
+
+        # Hit and miss counts of the process-local cache.
+        self.stats = {'hits': 0, 'misses': 0}
+
     def cache_key(self, instance, args=None, kwargs=None):
         return self.key_func(instance, label=self.label, version=self.version,
                              args=args, kwargs=kwargs)
 
+    def stale_key(self, instance, args=None, kwargs=None):
+        "Returns the version-less key the stale data is stored under."
+        return self.key_func(instance, label=self.label + ':stale',
+                             args=args, kwargs=kwargs)
+
+    def _local_get(self, key):
+        local = get_local_cache()
+
+        if local is None:
+            return
+
+        entry = local.get(key)
+
+        if entry is not None:
+            expires, data = entry
+
+            if expires > time.time():
+                self.stats['hits'] += 1
+                logger.debug('Hit local property cache "{0}"'.format(key))
+                return data
+
+            local.delete(key)
+
+        self.stats['misses'] += 1
+
+    def _local_set(self, key, data):
+        local = get_local_cache()
+
+        if local is None:
+            return
+
+        timeout = settings.DATA_CACHE_L1_TIMEOUT
+
+        if self.timeout is not None:
+            timeout = min(timeout, self.timeout)
+
+        local.set(key, (time.time() + timeout, data))
+
     def _set(self, key, data):
         logger.debug('Compute property cache "{0}"'.format(key))
         cache = get_cache(settings.DATA_CACHE)
 
         if data is not None:
             cache.set(key, data, timeout=self.timeout)
+            self._local_set(key, data)
             logger.debug('Set property cache "{0}"'.format(key))
 
+    def _get(self, key):
+        data = self._local_get(key)
+
+        if data is None:
+            cache = get_cache(settings.DATA_CACHE)
+            data = cache.get(key)
+
+            if data is not None:
+                self._local_set(key, data)
+
+        return data
+
     def get(self, instance, args=None, kwargs=None):
         key = self.cache_key(instance, args, kwargs)
-        cache = get_cache(settings.DATA_CACHE)
-        data = cache.get(key)
+        data = self._get(key)
         logger.debug('Get property cache "{0}"'.format(key))
         return data
 
+    def _compute(self, instance, args, kwargs):
+        if args is None:
+            args = ()
+
+        if kwargs is None:
+            kwargs = {}
+
+        return self.func(instance, *args, **kwargs)
+
+    def _single_flight(self, key, instance, args, kwargs):
+        cache = get_cache(settings.DATA_CACHE)
+        lock_key = key + ':lock'
+
+        if self.stale_timeout:
+            stale_key = self.stale_key(instance, args, kwargs)
+        else:
+            stale_key = None
+
+        # Another process is computing the data. Use the stale data if
+        # available, otherwise wait for the data to be set.
+        if not cache.add(lock_key, 1, self.lock_timeout):
+            if stale_key:
+                data = cache.get(stale_key)
+
+                if data is not None:
+                    logger.debug('Use stale property cache "{0}"'
+                                 .format(key))
+                    return data
+
+            deadline = time.time() + self.wait_timeout
+
+            while time.time() < deadline:
+                time.sleep(self.wait_interval)
+
+                data = self._get(key)
+
+                if data is not None:
+                    return data
+
+                # The lock was released or expired without the data being
+                # set, e.g. the result was None.
+                if cache.add(lock_key, 1, self.lock_timeout):
+                    break
+            else:
+                logger.warning('Timed out waiting for property cache "{0}"'
+                               .format(key))
+                return self._compute(instance, args, kwargs)
+
+        try:
+            # The data may have been set while acquiring the lock.
+            data = self._get(key)
+
+            if data is not None:
+                return data
+
+            data = self._compute(instance, args, kwargs)
+            self._set(key, data)
+
+            if stale_key and data is not None:
+                cache.set(stale_key, data, timeout=self.stale_timeout)
+        finally:
+            cache.delete(lock_key)
+
+        return data
+
     def get_or_set(self, instance, args=None, kwargs=None):
         # Reference to prevent the key from being changed mid-execution
         key = self.cache_key(instance, args, kwargs)
 
-        cache = get_cache(settings.DATA_CACHE)
-        data = cache.get(key)
+        data = self._get(key)
 
         if data is None:
-            if args is None:
-                args = ()
+            data = self.set_missing(instance, args, kwargs, key=key)
 
-            if kwargs is None:
-                kwargs = {}
+        return data
 
-            data = self.func(instance, *args, **kwargs)
-            self._set(key, data)
+    def set_missing(self, instance, args=None, kwargs=None, key=None):
+        """Computes and caches the data after a miss, e.g. of `get_many`.
+        If the proxy is single-flight, only one process computes it.
+        """
+        if key is None:
+            key = self.cache_key(instance, args, kwargs)
+
+        if self.single_flight:
+            return self._single_flight(key, instance, args, kwargs)
+
+        data = self._compute(instance, args, kwargs)
+        self._set(key, data)
 
         return data
 
@@ -56,6 +269,12 @@ class CacheProxy(object):
         key = self.cache_key(instance, args, kwargs)
         cache = get_cache(settings.DATA_CACHE)
         cache.delete(key)
+
+        local = get_local_cache()
+
+        if local is not None:
+            local.delete(key)
+
         logger.debug('Delete property cache "{0}"'.format(key))
 
     def cached(self, instance, args=None, kwargs=None):
@@ -1,10 +1,90 @@
+import time
 from django.core.cache import get_cache
 from django.db.models.query import QuerySet
+from django.db.models.sql.datastructures import EmptyResultSet
 from avocado.conf import settings
-from .model import cache_key_func
+from .model import cache_key, cache_key_func, NEVER_EXPIRE
 
 PK_LOOKUPS = ('pk', 'pk__exact')
 
+# Key of the global data epoch in the `QUERY_CACHE`. Cached query results
+# are stored with the epoch, so incrementing it invalidates all of them when
+# the underlying data changes.
+DATA_EPOCH_KEY = 'avocado:data_epoch'
+
+
+def _initial_epoch():
+    # Time-based so an evicted epoch does not revive older results.
+    return int(time.time() * 1000)
+
+
+def get_data_epoch():
+    "Returns the current data epoch."
+    cache = get_cache(settings.QUERY_CACHE)
+    epoch = cache.get(DATA_EPOCH_KEY)
+
+    if epoch is None:
+        # Another process may have initialized it in the meantime.
+        cache.add(DATA_EPOCH_KEY, _initial_epoch(), timeout=NEVER_EXPIRE)
+        epoch = cache.get(DATA_EPOCH_KEY)
+
+    return epoch
+
+
+def incr_data_epoch():
+    "Increments the data epoch, invalidating all cached query results."
+    cache = get_cache(settings.QUERY_CACHE)
+
+    try:
+        return cache.incr(DATA_EPOCH_KEY)
+    except ValueError:
+        epoch = _initial_epoch()
+        cache.set(DATA_EPOCH_KEY, epoch, timeout=NEVER_EXPIRE)
+        return epoch
+
+
+def cached_count(queryset, timeout=None):
+    """Returns the count of the queryset from the `QUERY_CACHE`.
+
+    The key is derived from the compiled SQL and parameters, so equivalent
+    querysets share the count regardless of how they were built, e.g. by the
+    contexts of different users. The count is stored with the data epoch
+    and is only used while the epoch is current. Changes to the data that do
+    not increment the epoch are reflected once the count expires after
+    `timeout` seconds, which defaults to `QUERY_COUNT_CACHE_TIMEOUT`.
+    """
+    if not settings.QUERY_COUNT_CACHE_ENABLED:
+        return queryset.count()
+
+    if timeout is None:
+        timeout = settings.QUERY_COUNT_CACHE_TIMEOUT
+
+    try:
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        return 0
+
+    key = cache_key('query_count', args=[queryset.db, sql, tuple(params)])
+
+    # The epoch and the count are fetched in a single round trip.
+    cache = get_cache(settings.QUERY_CACHE)
+    values = cache.get_many([DATA_EPOCH_KEY, key])
+
+    epoch = values.get(DATA_EPOCH_KEY)
+
+    if epoch is None:
+        epoch = get_data_epoch()
+    elif key in values:
+        count_epoch, count = values[key]
+
+        if count_epoch == epoch:
+            return count
+
+    count = queryset.count()
+    cache.set(key, (epoch, count), timeout=timeout)
+
+    return count
+
 
 class CacheQuerySet(QuerySet):
     def filter(self, *args, **kwargs):
@@ -1,3 +1,4 @@
+import threading
 try:
     from collections import OrderedDict
 except ImportError:
@@ -22,3 +23,50 @@ class ChoicesDict(OrderedDict):
             data[-1] = '...(remaining elements truncated)...'
 
         return repr(tuple(data))
+
+
+class LRUCache(object):
+    """Mapping bounded to `maxsize` keys. When full, the least recently used
+    key is evicted to make room for the new one. If `maxsize` is None, the
+    cache is unbounded.
+
+    Access is synchronized so a cache can be shared across threads.
+    """
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+
+            # Re-insert to mark it as the most recently used.
+            self._data[key] = value
+
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+
+            if self.maxsize and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -2,7 +2,7 @@ from random import choice
 from string import ascii_lowercase, digits
 from django import forms
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, connections
 from django.utils.importlib import import_module
 from avocado.conf import settings
 
@@ -11,6 +11,23 @@ from avocado.conf import settings
 # I think that will cover it..
 USERNAME_CHARS = ascii_lowercase + digits + '@.+-_'
 
+# Database connections inherited from the parent process by a forked worker.
+# The sockets are shared with the parent, so the connections are kept
+# referenced to prevent them from being closed when they are garbage
+# collected.
+_inherited_connections = []
+
+
+def detach_connections():
+    """Forces new database connections to be opened in a forked worker
+    process rather than sharing the connections of the parent. Called from
+    the initializer of a process pool.
+    """
+    for conn in connections.all():
+        if conn.connection is not None:
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+
 
 def get_form_class(name):
     # Absolute import if a period exists, otherwise assume the
@@ -19,4 +19,8 @@ if OPTIONAL_DEPS['openpyxl']:
     from _excel import ExcelExporter
     registry.register(ExcelExporter, ExcelExporter.short_name.lower())
 
+if OPTIONAL_DEPS['pyarrow']:
+    from _parquet import ParquetExporter
+    registry.register(ParquetExporter, ParquetExporter.short_name.lower())
+
 loader.autodiscover('exporters')
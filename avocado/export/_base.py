@@ -1,10 +1,33 @@
-import functools
+import threading
+from collections import deque
+from itertools import chain, islice, izip
+from multiprocessing import Pool, cpu_count
 from multiprocessing.pool import ThreadPool
+from avocado.core.structures import LRUCache
+from avocado.core.utils import detach_connections
 from avocado.models import DataView
 from avocado.formatters import FormatterMismatchError, registry as formatters
+from _compression import COMPRESSIONS, get_compressor
 from cStringIO import StringIO
 
 
+# Exporter bound to a worker process of the `parallel` reader.
+_worker_exporter = None
+
+
+def _init_worker(exporter):
+    global _worker_exporter
+
+    _worker_exporter = exporter
+
+    # Force new connections to be opened if a formatter queries the database.
+    detach_connections()
+
+
+def _worker_format_rows(rows, context):
+    return _worker_exporter._format_rows(rows, context)
+
+
 class BaseExporter(object):
     "Base class for all exporters"
     short_name = 'base'
@@ -20,12 +43,39 @@ class BaseExporter(object):
         'threaded',
         'cached',
         'cached_threaded',
+        'parallel',
+        'columnar',
     )
 
-    def __init__(self, concepts=None, preferred_formats=None):
+    # Number of rows handed to a worker at a time by the threaded and
+    # parallel readers and formatted at a time by the columnar reader.
+    chunk_size = 1000
+
+    # Maximum number of formatted segments held by the cached readers. Once
+    # full, the least recently used segment is evicted.
+    cache_size = 10000
+
+    # Number of cache lookups a formatter makes before its hit ratio is
+    # evaluated. If the ratio is below `cache_min_hit_ratio`, the formatter
+    # bypasses the cache for the remainder of the read since its output is
+    # unlikely to be reused, e.g. dates or identifiers.
+    cache_warmup = 1000
+    cache_min_hit_ratio = 0.1
+
+    # Compressions the output of `write` can be streamed through. The
+    # level defaults to the one of the compression if not set.
+    compressions = ()
+    compression = None
+    compression_level = None
+
+    def __init__(self, concepts=None, preferred_formats=None,
+                 compression=None, compression_level=None):
         if preferred_formats is not None:
             self.preferred_formats = preferred_formats
 
+        if compression is not None:
+            self.set_compression(compression, compression_level)
+
         if concepts is None:
             concepts = ()
         elif isinstance(concepts, DataView):
@@ -43,7 +93,7 @@ class BaseExporter(object):
             formatter_class = formatters.get(concept.formatter)
             self.add_formatter(formatter_class, concept=concept)
 
-        self._format_cache = {}
+        self._reset_format_cache()
 
     def __repr__(self):
         return u'<{0}: {1}/{2}>'.format(self.__class__.__name__,
@@ -95,6 +145,47 @@ class BaseExporter(object):
 
         return name
 
+    def set_compression(self, compression, level=None):
+        """Sets the compression of the output. The file extension and content
+        type are updated to match, e.g. 'csv.gz' and 'application/gzip'.
+        Passing None removes the compression.
+        """
+        self._check_compression(compression)
+
+        # The uncompressed extension and type are kept to be restored.
+        if self.compression is None:
+            self._uncompressed = (self.file_extension, self.content_type)
+
+        file_extension, content_type = self._uncompressed
+
+        if compression is not None:
+            suffix, content_type = COMPRESSIONS[compression][:2]
+            file_extension = '{0}.{1}'.format(file_extension, suffix)
+
+        self.file_extension = file_extension
+        self.content_type = content_type
+        self.compression = compression
+        self.compression_level = level
+
+    def _check_compression(self, compression):
+        if compression is not None and compression not in self.compressions:
+            raise ValueError('{0} does not support {1} compression'
+                             .format(self.__class__.__name__, compression))
+
+    def get_compressed_file_obj(self, buff):
+        """Returns a file object that compresses the output into `buff` as it
+        is written, or `buff` itself if the output is not compressed. A
+        compressed file object must be closed to end the compressed stream,
+        which leaves `buff` open.
+
+        The compression is set with `set_compression`, which also updates
+        the file extension and content type to match the output.
+        """
+        if self.compression is None:
+            return buff
+
+        return get_compressor(buff, self.compression, self.compression_level)
+
     def _check_header(self, row, context):
         self._header_checked = True
 
@@ -130,6 +221,45 @@ class BaseExporter(object):
 
         return tuple(_row)
 
+    def _format_rows(self, rows, context=None):
+        "Formats a batch of rows with one call per formatter."
+        if not rows:
+            return []
+
+        if not self._header_checked:
+            self._check_header(rows[0], context)
+
+        segments = []
+        start = 0
+
+        for formatter, length in self.params:
+            end = start + length
+
+            segments.append(formatter.format_batch(
+                [row[start:end] for row in rows], context=context))
+
+            start = end
+
+        return [tuple(chain.from_iterable(row)) for row in zip(*segments)]
+
+    def _cache_format_rows(self, rows, context=None):
+        return [self._cache_format_row(row, context=context) for row in rows]
+
+    def _reset_format_cache(self):
+        self._format_cache = LRUCache(self.cache_size)
+        self._format_cache_stats = {}
+
+        # Synchronizes the stats, which are updated by the worker threads
+        # of the cached threaded reader.
+        self._format_cache_lock = threading.Lock()
+
+    @property
+    def format_cache_stats(self):
+        """Returns the cache hits, misses, and whether the cache has been
+        bypassed for each formatter since the last cached read.
+        """
+        return dict((f, dict(s)) for f, s in self._format_cache_stats.items())
+
     def _cache_format_row(self, row, context=None):
         if not self._header_checked:
             self._check_header(row, context)
@@ -139,14 +269,38 @@ class BaseExporter(object):
         for formatter, length in self.params:
             values, row = row[:length], row[length:]
 
+            stats = self._format_cache_stats.get(formatter)
+
+            if stats is None:
+                with self._format_cache_lock:
+                    stats = self._format_cache_stats.setdefault(formatter, {
+                        'hits': 0,
+                        'misses': 0,
+                        'bypassed': False,
+                    })
+
+            if stats['bypassed']:
+                _row.extend(formatter(values, context=context))
+                continue
+
             key = (formatter, values)
+            segment = self._format_cache.get(key)
 
-            if key not in self._format_cache:
+            if segment is None:
                 segment = formatter(values, context=context)
-
-                self._format_cache[key] = segment
+                self._format_cache.set(key, segment)
+                counter = 'misses'
             else:
-                segment = self._format_cache[key]
+                counter = 'hits'
+
+            with self._format_cache_lock:
+                stats[counter] += 1
+
+                lookups = stats['hits'] + stats['misses']
+
+                if lookups >= self.cache_warmup and \
+                        stats['hits'] < lookups * self.cache_min_hit_ratio:
+                    stats['bypassed'] = True
 
             _row.extend(segment)
 
@@ -162,6 +316,12 @@ class BaseExporter(object):
         if name == 'cached_threaded':
             return self.cached_threaded_read
 
+        if name == 'parallel':
+            return self.parallel_read
+
+        if name == 'columnar':
+            return self.columnar_read
+
         if name == 'manual':
             return self.manual_read
 
@@ -182,45 +342,142 @@ class BaseExporter(object):
 
         This read implementation caches the output segments of the input
         values and can significantly speed up formatting at the expense of
-        memory.
+        memory. The cache is bounded by `cache_size`.
 
         The benefit of this method is dependent on the data. If there is
         high variability in the data, this method may not perform well.
+        Formatters whose hit ratio stays below `cache_min_hit_ratio` after
+        `cache_warmup` lookups bypass the cache.
         """
-        self._format_cache = {}
+        self._reset_format_cache()
 
         for row in iterable:
             yield self._cache_format_row(row, context=kwargs)
 
-    def threaded_read(self, iterable, threads=None, *args, **kwargs):
+    def _pool_read(self, iterable, func, workers, processes=False,
+                   chunk_size=None, context=None):
+        """Formats chunks of the iterable in a pool of worker threads or
+        processes and generates the formatted rows in order.
+
+        At most two chunks per worker are read ahead of the consumer, so rows
+        are emitted as soon as the first chunk is formatted and memory is
+        bounded regardless of the size of the iterable. The pool is shut down
+        when the iterable is exhausted or the generator is closed.
+        """
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+
+        if processes:
+            pool = Pool(workers, _init_worker, (self,))
+        else:
+            pool = ThreadPool(workers)
+
+        iterator = iter(iterable)
+        pending = deque()
+
+        try:
+            while True:
+                rows = list(islice(iterator, chunk_size))
+
+                if rows:
+                    pending.append(pool.apply_async(func, (rows, context)))
+
+                # Emit chunks that are done, in order, blocking on the oldest
+                # chunk if too many are in flight or nothing is left to read.
+                while pending and (not rows or pending[0].ready() or
+                                   len(pending) >= workers * 2):
+                    for row in pending.popleft().get():
+                        yield row
+
+                if not rows:
+                    break
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def threaded_read(self, iterable, threads=None, chunk_size=None, *args,
+                      **kwargs):
         """Reads an iterable and generates formatted rows.
 
         This read implementation starts a pool of worker threads to format
-        the data in parallel.
+        the data in parallel. The iterable is read in chunks of `chunk_size`
+        rows and the rows are generated in order as each chunk is formatted.
         """
-        pool = ThreadPool(threads)
-
-        f = functools.partial(self._format_row,
-                              context=kwargs)
+        workers = threads or cpu_count()
 
-        for row in pool.map(f, iterable):
-            yield row
+        return self._pool_read(iterable, self._format_rows, workers,
+                               chunk_size=chunk_size, context=kwargs)
 
-    def cached_threaded_read(self, iterable, threads=None, *args, **kwargs):
+    def cached_threaded_read(self, iterable, threads=None, chunk_size=None,
+                             *args, **kwargs):
         """Reads an iterable and generates formatted rows.
 
         This read implementation combines the `cached_read` and `threaded_read`
         methods.
         """
-        self._format_cache = {}
+        self._reset_format_cache()
 
-        pool = ThreadPool(threads)
+        workers = threads or cpu_count()
 
-        f = functools.partial(self._cache_format_row,
-                              context=kwargs)
+        return self._pool_read(iterable, self._cache_format_rows, workers,
+                               chunk_size=chunk_size, context=kwargs)
 
-        for row in pool.map(f, iterable):
-            yield row
+    def parallel_read(self, iterable, processes=None, chunk_size=None, *args,
+                      **kwargs):
+        """Reads an iterable and generates formatted rows.
+
+        This read implementation is the same as `threaded_read`, but uses a
+        pool of worker processes. This benefits formatters that are CPU-bound
+        in Python code since threads are limited by the GIL. The formatted
+        values must be picklable.
+
+        The exporter is passed to the workers when the pool starts. It holds
+        thread locks, which cannot be pickled, so this relies on the workers
+        being forked, the default on Unix. It does not work on platforms
+        that spawn the workers, such as Windows.
+        """
+        workers = processes or cpu_count()
+
+        return self._pool_read(iterable, _worker_format_rows, workers,
+                               processes=True, chunk_size=chunk_size,
+                               context=kwargs)
+
+    def columnar_read(self, iterable, chunk_size=None, *args, **kwargs):
+        """Reads an iterable and generates formatted rows.
+
+        This read implementation reads the iterable in chunks of `chunk_size`
+        rows and transposes each chunk into columns once. Each formatter
+        formats its columns as a whole and the output columns are zipped
+        back into rows. This avoids slicing every row for each formatter.
+        """
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+
+        iterator = iter(iterable)
+
+        while True:
+            rows = list(islice(iterator, chunk_size))
+
+            if not rows:
+                break
+
+            if not self._header_checked:
+                self._check_header(rows[0], kwargs)
+
+            columns = zip(*rows)
+            output = []
+            start = 0
+
+            for formatter, length in self.params:
+                end = start + length
+
+                output.extend(formatter.format_columns(columns[start:end],
+                                                       context=kwargs))
+
+                start = end
+
+            for row in izip(*output):
+                yield row
 
     def manual_read(self, iterable, force_distinct=True, offset=None,
                     limit=None, *args, **kwargs):
@@ -0,0 +1,69 @@
+from gzip import GzipFile
+from django.core.exceptions import ImproperlyConfigured
+from avocado.conf import OPTIONAL_DEPS
+
+
+class ZstdWriter(object):
+    """File-like object that compresses the data written to it into
+    `fileobj` as a Zstandard frame. Closing the writer ends the frame, but
+    leaves `fileobj` open like `GzipFile`.
+    """
+    def __init__(self, fileobj, level):
+        import zstandard
+
+        self._flush_frame = zstandard.FLUSH_FRAME
+        self._writer = zstandard.ZstdCompressor(level=level)\
+            .stream_writer(fileobj)
+
+        self.closed = False
+
+    def write(self, data):
+        self._writer.write(data)
+
+    def flush(self):
+        # Flushing a block would hurt the compression ratio, so the data
+        # is only flushed when the frame ends.
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+        self._writer.flush(self._flush_frame)
+
+
+def _gzip(fileobj, level):
+    return GzipFile(fileobj=fileobj, mode='wb', compresslevel=level)
+
+
+def _zstd(fileobj, level):
+    if not OPTIONAL_DEPS['zstandard']:
+        raise ImproperlyConfigured('zstandard must be installed to use '
+                                   'zstd compression.')
+
+    return ZstdWriter(fileobj, level)
+
+
+# Streaming compressions by name with the suffix of the file extension,
+# the content type, default level and the writer of the output.
+COMPRESSIONS = {
+    'gzip': ('gz', 'application/gzip', 6, _gzip),
+    'zstd': ('zst', 'application/zstd', 3, _zstd),
+}
+
+
+def get_compressor(fileobj, compression, level=None):
+    """Returns a file object that compresses the data written to it into
+    `fileobj` as it is written. It must be closed to write the end of the
+    compressed stream, which leaves `fileobj` open.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError('unknown compression: {0}'.format(compression))
+
+    suffix, content_type, default_level, writer = COMPRESSIONS[compression]
+
+    if level is None:
+        level = default_level
+
+    return writer(fileobj, level)
@@ -1,7 +1,14 @@
 import csv
+from itertools import islice
 from _base import BaseExporter
 
 
+def _encode(s, encoding='utf-8'):
+    if isinstance(s, unicode):
+        return s.encode(encoding)
+    return s
+
+
 class UnicodeWriter(object):
     """
     A CSV writer which will write rows to CSV file "f",
@@ -10,20 +17,30 @@ class UnicodeWriter(object):
     Adapted from https://github.com/jdunck/python-unicodecsv/blob/master/unicodecsv/__init__.py   # noqa
     """
 
+    # Number of rows encoded and handed to the underlying writer at a time
+    # by `writerows`.
+    batch_size = 1000
+
     def __init__(self, f, dialect=csv.excel, encoding='utf-8', *args, **kwds):
         self.encoding = encoding
         self.writer = csv.writer(f, dialect, *args, **kwds)
 
     def writerow(self, row):
-        self.writer.writerow([
-            s.encode("utf-8")
-            if 'encode' in dir(s) else s
-            for s in row
-        ])
+        encoding = self.encoding
+        self.writer.writerow([_encode(s, encoding) for s in row])
 
     def writerows(self, rows):
-        for row in rows:
-            self.writerow(row)
+        encoding = self.encoding
+        rows = iter(rows)
+
+        while True:
+            batch = [[_encode(s, encoding) for s in row]
+                     for row in islice(rows, self.batch_size)]
+
+            if not batch:
+                break
+
+            self.writer.writerows(batch)
 
 
 class CSVExporter(BaseExporter):
@@ -35,13 +52,23 @@ class CSVExporter(BaseExporter):
 
     preferred_formats = ('csv', 'string')
 
+    compressions = ('gzip', 'zstd')
+
     def write(self, iterable, buff=None, *args, **kwargs):
+        """Writes the rows as CSV. The output is compressed as it is written
+        if a compression is set.
+        """
         buff = self.get_file_obj(buff)
-        writer = UnicodeWriter(buff, quoting=csv.QUOTE_MINIMAL)
+        out = self.get_compressed_file_obj(buff)
 
-        writer.writerow([f['label'] for f in self.header])
+        try:
+            writer = UnicodeWriter(out, quoting=csv.QUOTE_MINIMAL)
 
-        for row in iterable:
-            writer.writerow(row)
+            writer.writerow([f['label'] for f in self.header])
+            writer.writerows(iterable)
+        finally:
+            # Ends the compressed stream. The underlying buffer is left open.
+            if out is not buff:
+                out.close()
 
         return buff
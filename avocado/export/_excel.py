@@ -1,3 +1,5 @@
+from shutil import copyfileobj
+from tempfile import TemporaryFile
 from django.http import HttpResponse
 from django.core.exceptions import ImproperlyConfigured
 from avocado.conf import OPTIONAL_DEPS
@@ -18,22 +20,55 @@ class ExcelExporter(BaseExporter):
 
     preferred_formats = ('excel', 'string')
 
+    # Maximum number of rows of a worksheet, including the header row. The
+    # data rolls over to a new worksheet past this.
+    max_rows = 1048576
+
+    # Size of the chunks the saved workbook is copied to a response in.
+    copy_buffer_size = 64 * 1024
+
+    def _data_sheets(self, wb, iterable):
+        "Appends the rows to as many data worksheets as they need."
+        labels = [f['label'] for f in self.header]
+        ws_data = None
+        count = 0
+        sheets = 0
+
+        for row in iterable:
+            if ws_data is None or count == self.max_rows:
+                sheets += 1
+
+                ws_data = wb.create_sheet()
+
+                if sheets == 1:
+                    ws_data.title = 'Data'
+                else:
+                    ws_data.title = 'Data ({0})'.format(sheets)
+
+                ws_data.append(labels)
+                count = 1
+
+            ws_data.append(row)
+            count += 1
+
+        # The header is still written if there are no rows.
+        if ws_data is None:
+            ws_data = wb.create_sheet()
+            ws_data.title = 'Data'
+            ws_data.append(labels)
+
     def write(self, iterable, buff=None, *args, **kwargs):
         buff = self.get_file_obj(buff)
 
         # Reference the header
         header = self.header
 
+        # Rows are written to temporary files by the worksheets in this
+        # mode rather than kept in memory.
         wb = Workbook(optimized_write=True)
 
-        ws_data = wb.create_sheet()
-        ws_data.title = 'Data'
-
-        # Create the data worksheet
-        ws_data.append([f['label'] for f in header])
-
-        for row in iterable:
-            ws_data.append(row)
+        # Create the data worksheets
+        self._data_sheets(wb, iterable)
 
         ws_dict = wb.create_sheet()
         ws_dict.title = 'Data Dictionary'
@@ -52,15 +87,14 @@ class ExcelExporter(BaseExporter):
                 f['description'],
             ))
 
-        # This hacked up implementation is due to `save_virtual_workbook`
-        # not behaving correctly. This function should handle the work
-        # https://bitbucket.org/ericgazoni/openpyxl/src/94b05cf9defb9787b4dfbf9e8dca7ba6e0b33d56/openpyxl/writer/excel.py?at=default#cl-154     # noqa
-        # however, no data is actually being saved to the worksheets..
+        # The workbook is saved to a temporary file since saving requires
+        # seeking, which a response does not support. It is then copied to
+        # the response in chunks rather than held in memory twice.
         if isinstance(buff, HttpResponse):
-            _buff = self.get_file_obj()
-            wb.save(_buff)
-            buff.content = _buff.getvalue()
-            _buff.close()
+            with TemporaryFile() as _buff:
+                wb.save(_buff)
+                _buff.seek(0)
+                copyfileobj(_buff, buff, self.copy_buffer_size)
         else:
             wb.save(buff)
 
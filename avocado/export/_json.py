@@ -21,16 +21,75 @@ class JSONExporter(BaseExporter):
 
     preferred_formats = ('json',)
 
-    def write(self, iterable, buff=None, *args, **kwargs):
-        buff = self.get_file_obj(buff)
+    # Output layout of the rows:
+    # - 'objects' is an array with an object per row keyed by the header
+    # - 'compact' is an array of arrays, the first being the header names
+    # - 'ndjson' is newline-delimited JSON with an object per line
+    modes = ('objects', 'compact', 'ndjson')
+    mode = 'objects'
+
+    compressions = ('gzip', 'zstd')
+
+    def __init__(self, *args, **kwargs):
+        mode = kwargs.pop('mode', None)
+
+        if mode is not None:
+            self._check_mode(mode)
+            self.mode = mode
+
+            if mode == 'ndjson':
+                self.file_extension = 'ndjson'
+                self.content_type = 'application/x-ndjson'
+
+        super(JSONExporter, self).__init__(*args, **kwargs)
+
+    def _check_mode(self, mode):
+        if mode not in self.modes:
+            raise ValueError('unknown JSON mode: {0}'.format(mode))
+
+    def iterencode(self, iterable, mode=None):
+        """Yields the encoded output one row at a time, so the rows are never
+        held in memory. This can be passed to a `StreamingHttpResponse`.
+        """
+        mode = mode or self.mode
+        self._check_mode(mode)
 
-        encoder = JSONGeneratorEncoder()
+        encode = JSONGeneratorEncoder().encode
 
         keys = [f['name'] for f in self.header]
 
-        data = [dict(zip(keys, values)) for values in iterable]
+        if mode == 'ndjson':
+            for values in iterable:
+                yield encode(dict(zip(keys, values))) + '\n'
+
+            return
+
+        yield '['
+        delimiter = ''
+
+        if mode == 'compact':
+            yield encode(keys)
+            delimiter = ', '
+
+            for values in iterable:
+                yield delimiter + encode(list(values))
+        else:
+            for values in iterable:
+                yield delimiter + encode(dict(zip(keys, values)))
+                delimiter = ', '
+
+        yield ']'
+
+    def write(self, iterable, buff=None, mode=None, *args, **kwargs):
+        buff = self.get_file_obj(buff)
+        out = self.get_compressed_file_obj(buff)
 
-        for chunk in encoder.iterencode(data):
-            buff.write(chunk)
+        try:
+            for chunk in self.iterencode(iterable, mode=mode):
+                out.write(chunk)
+        finally:
+            # Ends the compressed stream. The underlying buffer is left open.
+            if out is not buff:
+                out.close()
 
         return buff
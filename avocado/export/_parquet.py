@@ -0,0 +1,202 @@
+from itertools import islice
+from django.core.exceptions import ImproperlyConfigured
+from avocado.conf import OPTIONAL_DEPS
+if not OPTIONAL_DEPS['pyarrow']:
+    raise ImproperlyConfigured('pyarrow must be installed to use this '
+                               'exporter.')
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from _base import BaseExporter
+
+
+def _decimal_type(field):
+    model_field = field.field
+
+    if model_field.max_digits is None or model_field.decimal_places is None:
+        return pa.float64()
+
+    return pa.decimal128(model_field.max_digits, model_field.decimal_places)
+
+
+# Arrow types by the internal type of the field. Other types are written as
+# strings.
+ARROW_TYPES = {
+    'auto': lambda f: pa.int64(),
+    'foreignkey': lambda f: pa.int64(),
+    'biginteger': lambda f: pa.int64(),
+    'integer': lambda f: pa.int64(),
+    'positiveinteger': lambda f: pa.int64(),
+    'positivesmallinteger': lambda f: pa.int64(),
+    'smallinteger': lambda f: pa.int64(),
+    'float': lambda f: pa.float64(),
+    'decimal': _decimal_type,
+    'boolean': lambda f: pa.bool_(),
+    'nullboolean': lambda f: pa.bool_(),
+    'date': lambda f: pa.date32(),
+    'datetime': lambda f: pa.timestamp('us'),
+    'time': lambda f: pa.time64('us'),
+}
+
+
+def _to_string(values):
+    return [v if v is None or isinstance(v, unicode) else unicode(v)
+            for v in values]
+
+
+class Column(object):
+    "Converts the values of an output column into Arrow arrays."
+    def __init__(self, header):
+        self.header = header
+        self.type = pa.string()
+        self.index = None
+
+        field = header['field']
+
+        if field is None:
+            return
+
+        # Coded fields are dictionary-encoded with the labels as the
+        # dictionary. The codes are in the same order as the values.
+        coded_labels = field.coded_labels()
+
+        if coded_labels:
+            labels = [unicode(label) for code, label in coded_labels]
+
+            self.index = dict((v, i) for i, v in enumerate(field.values()))
+            self.dictionary = pa.array(labels, type=pa.string())
+            self.type = pa.dictionary(pa.int32(), pa.string())
+        elif field.internal_type in ARROW_TYPES:
+            self.type = ARROW_TYPES[field.internal_type](field)
+
+    def array(self, values):
+        if self.index is not None:
+            index = self.index
+
+            # Values missing from the index, e.g. added since the values of
+            # the field were cached, cannot be encoded.
+            try:
+                indices = [None if v is None else index[v] for v in values]
+            except KeyError as e:
+                raise ValueError(u'{0!r} is not a value of {1}'
+                                 .format(e.args[0], self.header['field']))
+
+            indices = pa.array(indices, type=pa.int32())
+
+            return pa.DictionaryArray.from_arrays(indices, self.dictionary)
+
+        if self.type == pa.string():
+            values = _to_string(values)
+
+        return pa.array(values, type=self.type)
+
+    def check(self, values):
+        """Falls back to strings if the values of the first batch cannot be
+        converted to the type of the field, e.g. if the formatter outputs
+        labels rather than values or a value of a coded field is not in its
+        values.
+        """
+        try:
+            return self.array(values)
+        except (pa.ArrowException, TypeError, ValueError):
+            self.type = pa.string()
+            self.index = None
+
+            return self.array(values)
+
+    def field(self, name):
+        header = self.header
+
+        metadata = {
+            'label': header['label'],
+            'type': header['type'],
+            'description': header['description'],
+        }
+
+        metadata = dict((k, unicode(v).encode('utf-8'))
+                        for k, v in metadata.items() if v is not None)
+
+        return pa.field(name, self.type, metadata=metadata or None)
+
+
+class ParquetExporter(BaseExporter):
+    short_name = 'Parquet'
+    long_name = 'Apache Parquet'
+
+    file_extension = 'parquet'
+    content_type = 'application/octet-stream'
+
+    # Raw values preserve the types of the fields.
+    preferred_formats = ('parquet', 'raw')
+
+    # Number of rows written per record batch and row group.
+    batch_size = 10000
+
+    def _names(self):
+        "Returns unique column names from the header."
+        names = []
+        seen = set()
+
+        for f in self.header:
+            name = f['name']
+            i = 1
+
+            while name in seen:
+                i += 1
+                name = u'{0}_{1}'.format(f['name'], i)
+
+            seen.add(name)
+            names.append(name)
+
+        return names
+
+    def write(self, iterable, buff=None, *args, **kwargs):
+        """Writes the rows as Parquet, a row group per `batch_size` rows.
+
+        The column types are determined by the first batch. If a later
+        batch cannot be converted to them, e.g. a value of a coded field that
+        was not in the first batch is missing from the field's values, a
+        ValueError is raised. The row groups written up to that point are
+        left in `buff`, so the output is incomplete and must be discarded.
+        """
+        buff = self.get_file_obj(buff)
+
+        columns = [Column(f) for f in self.header]
+        names = self._names()
+        schema = None
+        writer = None
+
+        rows = iter(iterable)
+
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+
+                if not batch and writer is not None:
+                    break
+
+                values = zip(*batch) or [()] * len(columns)
+
+                # The schema is determined by the first batch.
+                if schema is None:
+                    arrays = [c.check(list(v))
+                              for c, v in zip(columns, values)]
+                    schema = pa.schema([c.field(n)
+                                        for c, n in zip(columns, names)])
+                    writer = pq.ParquetWriter(buff, schema)
+                else:
+                    arrays = [c.array(list(v))
+                              for c, v in zip(columns, values)]
+
+                writer.write_table(pa.Table.from_arrays(arrays,
+                                                        schema=schema))
+
+                if len(batch) < self.batch_size:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+
+        buff.flush()
+
+        return buff
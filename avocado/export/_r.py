@@ -1,10 +1,10 @@
 from zipfile import ZipFile
-from cStringIO import StringIO
 from string import punctuation
 from django.template import Context
 from django.template.loader import get_template
 from _base import BaseExporter
 from _csv import CSVExporter
+from _zip import ZipMemberWriter
 
 
 class RExporter(BaseExporter):
@@ -75,24 +75,20 @@ class RExporter(BaseExporter):
             coded_labels = f['field'].coded_labels()
 
             if coded_labels:
-                codes = self._code_values(name, f['field'], coded_labels)
+                codes = self._code_values(name, coded_labels)
                 factors.append(codes[0])
                 levels.append(codes[1])
 
         data_filename = 'data.csv'
         script_filename = 'script.R'
 
-        # File buffers
-        data_buff = StringIO()
-
         # Create the data file with this exporter's preferred formats.
         data_exporter = CSVExporter(self.concepts,
                                     preferred_formats=self.preferred_formats)
 
-        # Write the data file.
-        data_exporter.write(iterable, data_buff, *args, **kwargs)
-
-        zip_file.writestr(data_filename, data_buff.getvalue())
+        # Stream the data file into the archive as the rows are written.
+        with ZipMemberWriter(zip_file, data_filename) as data_file:
+            data_exporter.write(iterable, data_file, *args, **kwargs)
 
         template = get_template(template_name)
         context = Context({
@@ -1,10 +1,10 @@
 from zipfile import ZipFile
-from cStringIO import StringIO
 from string import punctuation
 from django.template import Context
 from django.template.loader import get_template
 from _base import BaseExporter
 from _csv import CSVExporter
+from _zip import ZipMemberWriter
 
 
 class SASExporter(BaseExporter):
@@ -127,17 +127,13 @@ class SASExporter(BaseExporter):
         data_filename = 'data.csv'
         script_filename = 'script.sas'
 
-        # File buffers
-        data_buff = StringIO()
-
         # Create the data file with this exporter's preferred formats.
         data_exporter = CSVExporter(self.concepts,
                                     preferred_formats=self.preferred_formats)
 
-        # Write data file.
-        data_exporter.write(iterable, data_buff, *args, **kwargs)
-
-        zip_file.writestr(data_filename, data_buff.getvalue())
+        # Stream the data file into the archive as the rows are written.
+        with ZipMemberWriter(zip_file, data_filename) as data_file:
+            data_exporter.write(iterable, data_file, *args, **kwargs)
 
         template = get_template(template_name)
         context = Context({
@@ -0,0 +1,105 @@
+import time
+import zlib
+import struct
+from zipfile import ZipInfo, LargeZipFile, ZIP_DEFLATED, ZIP64_LIMIT
+
+# Signature of the data descriptor following the data of a member whose
+# sizes and CRC are not known when its local header is written.
+DATA_DESCRIPTOR_SIGNATURE = 'PK\x07\x08'
+
+
+class ZipMemberWriter(object):
+    """File-like object that writes a new member of `zip_file` as data is
+    written to it, rather than requiring the whole member up front like
+    `ZipFile.writestr`. Data is compressed incrementally, so memory use does
+    not depend on the size of the member.
+
+    Since the sizes and CRC are only known at the end, they follow the data
+    in a data descriptor. This requires no seeking, so the underlying file
+    may be a response. No other member can be written to the zip file until
+    the writer is closed.
+
+    The local header has no ZIP64 extra field, so a member cannot exceed the
+    4 GB limit of the zip format. `LargeZipFile` is raised once it does.
+
+    This relies on the internals of Python 2.7's `zipfile.ZipFile`, namely
+    `_writecheck`, `_didModify`, `filelist` and `NameToInfo`, and must be
+    revisited for other versions.
+    """
+    def __init__(self, zip_file, name, compress_type=ZIP_DEFLATED):
+        zinfo = ZipInfo(name, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = compress_type
+        zinfo.external_attr = 0600 << 16
+        zinfo.flag_bits = 0x08
+        zinfo.CRC = zinfo.compress_size = zinfo.file_size = 0
+
+        zinfo.header_offset = zip_file.fp.tell()
+
+        zip_file._writecheck(zinfo)
+        zip_file._didModify = True
+
+        zip_file.fp.write(zinfo.FileHeader())
+
+        if compress_type == ZIP_DEFLATED:
+            self._compressor = zlib.compressobj(
+                zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        else:
+            self._compressor = None
+
+        self.zip_file = zip_file
+        self.zinfo = zinfo
+        self.closed = False
+
+    def _check_size(self):
+        zinfo = self.zinfo
+
+        if zinfo.file_size > ZIP64_LIMIT or \
+                zinfo.compress_size > ZIP64_LIMIT:
+            raise LargeZipFile('{0} exceeds the 4 GB limit of the zip format'
+                               .format(zinfo.filename))
+
+    def write(self, data):
+        zinfo = self.zinfo
+
+        zinfo.file_size += len(data)
+        zinfo.CRC = zlib.crc32(data, zinfo.CRC) & 0xffffffff
+
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+
+        if data:
+            zinfo.compress_size += len(data)
+            self.zip_file.fp.write(data)
+
+        self._check_size()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+        zinfo = self.zinfo
+
+        if self._compressor is not None:
+            data = self._compressor.flush()
+            zinfo.compress_size += len(data)
+            self.zip_file.fp.write(data)
+
+        self._check_size()
+
+        self.zip_file.fp.write(struct.pack(
+            '<4sLLL', DATA_DESCRIPTOR_SIGNATURE, zinfo.CRC,
+            zinfo.compress_size, zinfo.file_size))
+
+        # Registered so the central directory includes it on close.
+        self.zip_file.filelist.append(zinfo)
+        self.zip_file.NameToInfo[zinfo.filename] = zinfo
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -9,6 +9,7 @@ from collections import defaultdict, namedtuple
 from django.utils.encoding import force_unicode
 from django.template import defaultfilters as filters
 from avocado.core import loader
+from avocado.core.cache import FieldMemo
 
 log = logging.getLogger(__name__)
 
@@ -73,6 +74,35 @@ def _unique_dict(fields):
     return OrderedDict(pairs)
 
 
+def _build_coded_values(field):
+    coded_values = field.coded_values()
+
+    # ChoicesDict iterates over (code, value) pairs.
+    if coded_values is not None:
+        return dict(iter(coded_values))
+
+
+# Process-local snapshot of the coded values of fields shared by all
+# formatters.
+_coded_values = FieldMemo(_build_coded_values)
+
+
+def get_coded_values(field):
+    """Returns a plain dict of the field's coded values or None if the
+    field does not support coded values.
+
+    When the data cache is enabled, the dict is built once per
+    `data_version` and shared in-process rather than going through the
+    data cache on every lookup.
+    """
+    return _coded_values.get(field)
+
+
+# Marker returned by column format methods for values they cannot format.
+# The remaining format methods are tried for those values.
+UNFORMATTED = object()
+
+
 def process_multiple(func):
     "Decorator for marking a formatter method to process multiple values."
     func.process_multiple = True
@@ -91,6 +121,11 @@ class Formatter(object):
     or less values than the original. A `get_FORMAT_header` method must be
     implemented if a custom set of values are being emitted by a format
     method.
+
+    A format method may have a `to_FORMAT_column` counterpart that formats
+    a list of values for a field at once. It returns a list of outputs with
+    `UNFORMATTED` in place of values it cannot format. This is used by
+    `format_columns`.
     """
     html_delimiter = u' '
 
@@ -143,6 +178,14 @@ class Formatter(object):
         # Create a bare-bones record class.
         self._recordclass = namedtuple('record', self.field_names)
 
+        # Compiled function for formatting a tuple of values. This is
+        # built on the first call.
+        self._format = None
+
+        # Coded values of fields keyed by field primary key. These are
+        # resolved once for the lifetime of the formatter.
+        self._coded_values = {}
+
     def __contains__(self, choice):
         return hasattr(self, 'to_{0}'.format(choice))
 
@@ -154,69 +197,249 @@ class Formatter(object):
         if context is None:
             context = self.default_context
 
-        # Create a record of the values.
-        record = self._recordclass(*values)
+        if self._format is None:
+            self._format = self._compile()
 
-        # Process multi-value format methods first.
-        for method in self.multi_formats:
-            try:
-                output = self._process_multiple(method,
-                                                value=record,
-                                                context=context)
-            except ExpectedFormatterException:
-                continue
+        return self._format(values, context)
 
-            return output
+    def _overrides(self, name):
+        "Returns true if a subclass overrides the method `name`."
+        return getattr(type(self), name).im_func is not \
+            getattr(Formatter, name).im_func
+
+    def format_batch(self, rows, context=None):
+        """Formats a sequence of value tuples and returns a list of formatted
+        tuples. This is equivalent to calling the formatter on each tuple,
+        but avoids the per-call overhead for large batches.
+        """
+        # Subclasses that override __call__ must be called for each row.
+        if self._overrides('__call__'):
+            return [self(values, context=context) for values in rows]
+
+        if context is None:
+            context = self.default_context
+
+        if self._format is None:
+            self._format = self._compile()
+
+        format = self._format
+
+        return [format(values, context) for values in rows]
+
+    def format_columns(self, columns, context=None):
+        """Formats a batch of values given as columns, one sequence of values
+        per field, and returns the formatted output as a list of columns.
+
+        Single-value format methods are applied to a whole column at a time
+        using the `to_FORMAT_column` counterpart if defined.
+        """
+        # Multi-value format methods and overridden calls operate on rows.
+        if self.multi_formats or self._overrides('__call__') or \
+                self._overrides('_process_single'):
+            output = self.format_batch(zip(*columns), context=context)
+            return zip(*output)
+
+        if len(columns) != len(self.field_names):
+            raise TypeError('{0} expected {1} columns, got {2}'
+                            .format(self, len(self.field_names),
+                                    len(columns)))
 
-        # Optimization. Return raw values if no single-value formatters
-        # are being used.
         if not self.single_formats:
-            return tuple(record)
+            return list(columns)
+
+        if context is None:
+            context = self.default_context
+
+        methods = [(method, self._get_column_method(method))
+                   for method in self.single_formats]
 
-        # Process each value separately with the corresponding field.
         output = []
 
-        for i, key in enumerate(record._fields):
+        for key, values in zip(self.field_names, columns):
             field = self.fields.get(key)
+            output.extend(self._format_column(methods, values, field,
+                                              context))
+
+        return output
 
-            value = record[i]
+    def _get_column_method(self, method):
+        """Returns the column counterpart of a format method. If a subclass
+        overrides the format method, but not the counterpart, the inherited
+        counterpart is not used.
+        """
+        name = method.__name__
+        column_name = '{0}_column'.format(name)
 
-            for method in self.single_formats:
+        for klass in type(self).__mro__:
+            if column_name in klass.__dict__:
+                return getattr(self, column_name)
+
+            if name in klass.__dict__:
+                return
+
+    def _format_column(self, methods, values, field, context):
+        results = list(values)
+        remaining = range(len(values))
+
+        for method, column_method in methods:
+            pending = [values[i] for i in remaining]
+
+            if column_method:
                 try:
-                    value = self._process_single(method,
-                                                 value=value,
-                                                 field=field,
-                                                 context=context)
+                    outputs = column_method(pending, field=field,
+                                            context=context)
                 except ExpectedFormatterException:
                     continue
 
-                output.extend(value)
-                break
+                if not isinstance(outputs, (list, tuple)):
+                    outputs = list(outputs)
 
-            # Fallback to the raw value
+                if len(outputs) != len(pending):
+                    raise FormatterMismatchError(
+                        'Formatter "{0}" method "{1}" returned {2} values for '
+                        'a column of {3} values'
+                        .format(self, column_method.__name__, len(outputs),
+                                len(pending)))
             else:
-                output.append(record[i])
+                outputs = []
 
-        return tuple(output)
+                for value in pending:
+                    try:
+                        outputs.append(method(value, field=field,
+                                              context=context))
+                    except ExpectedFormatterException:
+                        outputs.append(UNFORMATTED)
 
-    def _process_single(self, method, value, field, context):
-        output = method(value, field=field, context=context)
+            unformatted = []
 
-        # Backwards compat for dicts.
-        if isinstance(output, dict):
-            warn('Formatter methods should return a tuple '
-                 'of values', DeprecationWarning)
+            for i, output in zip(remaining, outputs):
+                if output is UNFORMATTED:
+                    unformatted.append(i)
+                else:
+                    results[i] = output
 
-            return tuple(output.values())
+            remaining = unformatted
 
-        if not isinstance(output, (list, tuple)):
-            return (output,)
+            if not remaining:
+                break
 
-        return output
+        # Values that were not formatted keep the raw value. If any output
+        # is a sequence, the outputs are split into multiple columns.
+        for output in results:
+            if isinstance(output, (dict, list, tuple)):
+                break
+        else:
+            return [results]
 
-    def _process_multiple(self, method, value, context):
-        output = method(value, fields=self.fields, context=context)
+        return zip(*[self._normalize_output(o) for o in results])
+
+    def _compile(self):
+        """Resolves the formatting plan once and returns a function that
+        formats a tuple of values.
 
+        The field for each value and the format methods to try are looked
+        up here rather than on every call. A record is only constructed if
+        multi-value format methods are defined since those are the only
+        methods that receive one.
+        """
+        recordclass = self._recordclass
+        multi_formats = tuple(self.multi_formats)
+        single_formats = tuple(self.single_formats)
+        length = len(self.field_names)
+        fields = tuple(self.fields.get(key) for key in self.field_names)
+        process_multiple = self._process_multiple
+
+        # Subclasses that override `_process_single` must be called for each
+        # value rather than inlined.
+        if self._overrides('_process_single'):
+            process_single = self._process_single
+        else:
+            process_single = None
+
+        # Output types that are known to be single values. This is populated
+        # as outputs are seen to skip the sequence checks for each value.
+        scalars = set()
+
+        def format_single(values, context):
+            if len(values) != length:
+                raise TypeError('{0} expected {1} values, got {2}'
+                                .format(self, length, len(values)))
+
+            output = []
+
+            for i, value in enumerate(values):
+                field = fields[i]
+
+                for method in single_formats:
+                    if process_single is not None:
+                        try:
+                            output.extend(process_single(method, value,
+                                                         field, context))
+                        except ExpectedFormatterException:
+                            continue
+
+                        break
+
+                    try:
+                        value = method(value, field=field, context=context)
+                    except ExpectedFormatterException:
+                        continue
+
+                    cls = value.__class__
+
+                    if cls in scalars:
+                        output.append(value)
+                    elif cls is tuple or cls is list:
+                        output.extend(value)
+                    elif isinstance(value, (dict, list, tuple)):
+                        output.extend(self._normalize_output(value))
+                    else:
+                        scalars.add(cls)
+                        output.append(value)
+
+                    break
+
+                # Fallback to the raw value
+                else:
+                    output.append(values[i])
+
+            return tuple(output)
+
+        def format_multiple(values, context):
+            # Create a record of the values.
+            record = recordclass(*values)
+
+            # Process multi-value format methods first.
+            for method in multi_formats:
+                try:
+                    return process_multiple(method, value=record,
+                                            context=context)
+                except ExpectedFormatterException:
+                    continue
+
+            if not single_formats:
+                return tuple(record)
+
+            return format_single(record, context)
+
+        if multi_formats:
+            return format_multiple
+
+        if single_formats:
+            return format_single
+
+        # Optimization. Return raw values if no single-value formatters
+        # are being used.
+        def format_raw(values, context):
+            if len(values) != length:
+                raise TypeError('{0} expected {1} values, got {2}'
+                                .format(self, length, len(values)))
+
+            return tuple(values)
+
+        return format_raw
+
+    def _normalize_output(self, output):
         # Backwards compat for dicts.
         if isinstance(output, dict):
             warn('Formatter methods should return a tuple '
@@ -229,6 +452,16 @@ class Formatter(object):
 
         return output
 
+    def _process_single(self, method, value, field, context):
+        output = method(value, field=field, context=context)
+
+        return self._normalize_output(output)
+
+    def _process_multiple(self, method, value, context):
+        output = method(value, fields=self.fields, context=context)
+
+        return self._normalize_output(output)
+
     def get_default_header(self):
         concept = self.concept
 
@@ -341,6 +574,14 @@ class Formatter(object):
 
         return force_unicode(value, strings_only=False)
 
+    def to_string_column(self, values, field, context):
+        return [
+            u'' if value is None else
+            value if type(value) is unicode else
+            force_unicode(value, strings_only=False)
+            for value in values
+        ]
+
     def to_boolean(self, value, field, context):
         # If value is native True or False value, return it
         if type(value) is bool:
@@ -348,6 +589,10 @@ class Formatter(object):
 
         raise ExpectedFormatterException('cannot be converted into a boolean')
 
+    def to_boolean_column(self, values, field, context):
+        return [value if type(value) is bool else UNFORMATTED
+                for value in values]
+
     def to_number(self, value, field, context):
         # Attempts to convert a number. Starting with ints and floats
         # Eventually create to_decimal using the decimal library.
@@ -368,19 +613,59 @@ class Formatter(object):
 
         raise ExpectedFormatterException('cannot be converted into a number')
 
+    def to_number_column(self, values, field, context):
+        output = []
+
+        for value in values:
+            # Skip the method call for the common case.
+            if type(value) is int or type(value) is float:
+                output.append(value)
+                continue
+
+            try:
+                output.append(self.to_number(value, field, context))
+            except ExpectedFormatterException:
+                output.append(UNFORMATTED)
+
+        return output
+
+    def _get_coded_values(self, field):
+        try:
+            return self._coded_values[field.pk]
+        except KeyError:
+            coded_values = get_coded_values(field)
+
+            if field.pk is not None:
+                self._coded_values[field.pk] = coded_values
+
+            return coded_values
+
     def to_coded(self, value, field, context):
         # Attempts to convert value to its coded representation
         if field:
-            coded_values = field.coded_values()
+            coded_values = self._get_coded_values(field)
 
             if coded_values is not None:
                 return coded_values.get(value)
 
         raise ExpectedFormatterException('field does not support coded values')
 
+    def to_coded_column(self, values, field, context):
+        if field:
+            coded_values = self._get_coded_values(field)
+
+            if coded_values is not None:
+                get = coded_values.get
+                return [get(value) for value in values]
+
+        raise ExpectedFormatterException('field does not support coded values')
+
     def to_raw(self, value, field, context):
         return value
 
+    def to_raw_column(self, values, field, context):
+        return list(values)
+
 
 class RawFormatter(Formatter):
     def __init__(self, *args, **kwargs):
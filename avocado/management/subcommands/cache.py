@@ -1,9 +1,12 @@
+import os
 import sys
 import time
 import logging
+from multiprocessing import Pool
 from optparse import make_option
 from django.db import transaction
 from django.core.management.base import BaseCommand, CommandError
+from avocado.core.utils import detach_connections
 from avocado.models import DataField
 from avocado.management.base import DataFieldCommand
 
@@ -24,13 +27,86 @@ CACHED_METHODS = tuple(CACHED_METHODS)
 
 METHOD_CHOICES = ', '.join(CACHED_METHODS)
 
+# Relative cost of the methods used to order the work. Methods that select
+# the distinct values are more expensive than plain aggregations.
+METHOD_COSTS = {
+    'dist': 3,
+    'values': 2,
+    'labels': 2,
+    'codes': 2,
+    'size': 2,
+}
+
 
 __doc__ = """\
 Pre-caches data produced by various DataField methods that are data dependent.
 Pass `--flush` to explicitly flush any existing cache for each method.
+
+Pass `--workers` to populate the cache in parallel and `--checkpoint` to
+record progress to a file. If the command is interrupted, running it again
+with the same checkpoint file skips the completed work. The file is removed
+when a run completes without errors.
+
+`--workers` only helps if the data cache is shared between processes, e.g.
+memcached or Redis. With a process-local backend such as LocMemCache each
+worker populates its own cache and the results are lost when it exits.
 """
 
 
+# Fields to populate the cache for in a worker process keyed by primary key.
+_worker_fields = {}
+
+
+def _init_worker(pks):
+    global _worker_fields
+
+    # Force new connections to be opened in the worker process rather than
+    # sharing the parent's connections.
+    detach_connections()
+
+    # The fields are loaded once per run rather than for each task.
+    _worker_fields = DataField.objects.in_bulk(pks)
+
+
+@transaction.atomic
+def _handle_field_method(f, method, flush):
+    func = getattr(f, method)
+
+    if flush:
+        func.flush(f)
+
+    if func.cached(f):
+        return 'skipped'
+
+    if func() is not None:
+        return 'cached'
+
+    return 'empty'
+
+
+def _cache_field_method(f, method, flush):
+    "Populates the cache for the field and method."
+    t0 = time.time()
+
+    # By default, the settings run on sqlite3 DB so a DatabaseError will
+    # be triggered when the standard deviation or variance functions are
+    # used.
+    try:
+        status = _handle_field_method(f, method, flush)
+    except Exception:
+        log.exception('error populating cache for field {0} {1}'
+                      .format(f.pk, method))
+        status = 'error'
+
+    return f.pk, method, status, time.time() - t0
+
+
+def _worker_cache_field_method(args):
+    pk, method, flush = args
+
+    return _cache_field_method(_worker_fields[pk], method, flush)
+
+
 class Command(DataFieldCommand):
     help = __doc__
 
@@ -46,26 +122,65 @@ class Command(DataFieldCommand):
                     default=CACHED_METHODS,
                     help='Select which methods to pre-cache. Choices: {0}'
                          .format(METHOD_CHOICES)),
+
+        make_option('--workers',
+                    type='int',
+                    dest='workers',
+                    default=1,
+                    help='Number of processes to populate the cache with.'),
+
+        make_option('--checkpoint',
+                    dest='checkpoint',
+                    default=None,
+                    help='File to record progress to and resume from.'),
     )
 
-    @transaction.atomic
-    def _handle_field_method(self, f, method, flush):
-        func = getattr(f, method)
+    def _read_checkpoint(self, path):
+        "Returns the set of (pk, method) pairs that are complete."
+        done = set()
 
-        if flush:
-            func.flush(f)
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    pk, method = line.strip().split(':', 1)
+                    done.add((int(pk), method))
 
-        if func.cached(f):
-            self.skipped += 1
-        else:
-            data = func()
+        return done
+
+    def _get_tasks(self, fields, methods, done):
+        """Returns a list of (field, method) pairs ordered by estimated cost,
+        most expensive first, so the slowest work does not end up last.
+        The cost is estimated by the number of rows of the field's model.
+        """
+        counts = {}
+        tasks = []
+
+        for f in fields:
+            model = f.model
+
+            if model not in counts:
+                try:
+                    counts[model] = model.objects.count()
+                except Exception:
+                    counts[model] = 0
+
+            for method in methods:
+                if (f.pk, method) in done:
+                    self.resumed += 1
+                    continue
+
+                cost = counts[model] * METHOD_COSTS.get(method, 1)
+                tasks.append((cost, f, method))
 
-            if data is not None:
-                self.cached += 1
+        tasks.sort(key=lambda x: x[0], reverse=True)
+
+        return [(f, method) for _, f, method in tasks]
 
     def handle_fields(self, fields, **options):
         flush = options.get('flush')
         methods = options.get('methods')
+        workers = options.get('workers') or 1
+        checkpoint = options.get('checkpoint')
 
         # Validate methods
         for method in methods:
@@ -77,28 +192,78 @@ class Command(DataFieldCommand):
         self.skipped = 0
         self.cached = 0
         self.errors = 0
+        self.resumed = 0
+
+        # Total time and count by method.
+        timings = {}
 
         t0 = time.time()
 
-        for f in fields:
-            for method in methods:
+        done = self._read_checkpoint(checkpoint)
+        tasks = self._get_tasks(fields, methods, done)
+
+        if workers > 1:
+            pks = list(set(f.pk for f, method in tasks))
+            args = [(f.pk, method, flush) for f, method in tasks]
+
+            pool = Pool(workers, _init_worker, (pks,))
+            results = pool.imap_unordered(_worker_cache_field_method, args)
+        else:
+            pool = None
+            results = (_cache_field_method(f, method, flush)
+                       for f, method in tasks)
+
+        checkpoint_file = None
+
+        if checkpoint:
+            checkpoint_file = open(checkpoint, 'a')
+
+        try:
+            for pk, method, status, elapsed in results:
                 self.total += 1
 
-                # By default, the settings run on sqlite3 DB so a
-                # DatabaseError will be triggered when the standard deviation
-                # or variance functions are used.
-                try:
-                    self._handle_field_method(f, method, flush)
-                except Exception:
+                if status == 'error':
                     self.errors += 1
-                    log.exception('error populating cache for "{0}" {1}'
-                                  .format(f, method))
-
-            if self.total % 10 == 0:
-                sys.stdout.write('\r{0}/{1}/{2}/{3} '
-                                 'cached/skipped/errors/total'
-                                 .format(self.cached, self.skipped,
-                                         self.errors, self.total))
-                sys.stdout.flush()
+                else:
+                    if status == 'cached':
+                        self.cached += 1
+                    elif status == 'skipped':
+                        self.skipped += 1
+
+                    if checkpoint_file:
+                        checkpoint_file.write('{0}:{1}\n'.format(pk, method))
+                        checkpoint_file.flush()
+
+                timing = timings.setdefault(method, [0, 0.0])
+                timing[0] += 1
+                timing[1] += elapsed
+
+                if self.total % 10 == 0:
+                    sys.stdout.write('\r{0}/{1}/{2}/{3} '
+                                     'cached/skipped/errors/total'
+                                     .format(self.cached, self.skipped,
+                                             self.errors, self.total))
+                    sys.stdout.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+            if checkpoint_file:
+                checkpoint_file.close()
+
+        # The run is complete, so the next one starts over.
+        if checkpoint and not self.errors and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        if self.resumed:
+            print('\nResumed, {0} already cached'.format(self.resumed))
+
+        print('\nMethod timings:')
+
+        for method, (count, elapsed) in sorted(timings.items(),
+                                               key=lambda x: -x[1][1]):
+            print('  {0}: {1} s total, {2} s avg over {3} fields'.format(
+                method, round(elapsed, 2), round(elapsed / count, 3), count))
 
         print('\nTook {0} s'.format(round(time.time() - t0, 2)))
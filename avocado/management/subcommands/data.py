@@ -1,14 +1,16 @@
 import logging
 from django.db.models import F
 from optparse import make_option
+from avocado.core.cache import incr_data_epoch
 from avocado.management.base import DataFieldCommand
 
 log = logging.getLogger(__name__)
 
 __doc__ = """\
-Increments the `data_version` field on DataField instances. This will cause
-various cache that depends on this field to be refreshed the next time it is
-requested. To pre-cache, use the `avocado cache` command.
+Increments the `data_version` field on DataField instances and the global
+data epoch. This will cause various cache that depends on these to be
+refreshed the next time it is requested. To pre-cache, use the `avocado cache`
+command.
 """
 
 
@@ -33,6 +35,9 @@ class Command(DataFieldCommand):
         # Increments each field's data version
         updated = fields.update(data_version=F('data_version') + 1)
 
+        # Cached query results, such as counts, are invalidated as well
+        incr_data_epoch()
+
         print(u'{0} fields have been updated. Cached methods will '
               'lazily refresh their cache the next time they are '
               'accessed.'.format(updated))
@@ -1,17 +1,30 @@
 import logging
 from django.db import models
-from django.db.models import Q
+from django.db.models import Q, Count, Sum, Avg, Max, Min
 from django.db import transaction
 from django.conf import settings as djsettings
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models.manager import ManagerDescriptor
 from avocado.conf import OPTIONAL_DEPS, dep_supported, settings
 from avocado.core.managers import PublishedManager, PublishedQuerySet
+from avocado.core.cache.proxy import get_many, set_many
 
 
 logger = logging.getLogger(__name__)
 
 
+# Cached DataField methods that are computed as aggregations and can be
+# combined into one query per model. `avg` and `sum` only apply to
+# quantitative data.
+PREFETCH_AGGREGATES = {
+    'count': Count,
+    'min': Min,
+    'max': Max,
+    'avg': Avg,
+    'sum': Sum,
+}
+
+
 # [2014-11-05] HACK to resolve this issue:
 # https://github.com/toastdriven/django-haystack/issues/1009
 if OPTIONAL_DEPS['haystack']:
@@ -243,6 +256,77 @@ class DataFieldManager(PublishedManager, DataFieldSearchMixin):
             values = [app_name, model_name, field_name]
         return queryset.get(**dict(zip(keys, values)))
 
+    def prefetch_cached(self, fields, methods=('size', 'values', 'min',
+                                               'max')):
+        """Returns the output of the cached `methods` for each of the
+        fields as a dict keyed by field primary key and then method name.
+
+        The cache is read with one `get_many`. Missing aggregations, such as
+        `min` and `max`, are computed with one query per model and written
+        back with `set_many`. Other methods are computed and cached per field
+        like a call to the method, so single-flight methods are only
+        computed by one process at a time.
+        """
+        fields = list(fields)
+        enabled = settings.DATA_CACHE_ENABLED
+
+        output = {}
+        keys = []
+
+        for field in fields:
+            output[field.pk] = {}
+
+            for method in methods:
+                proxy = getattr(self.model, method).cache_proxy
+                keys.append((field, method, proxy, proxy.cache_key(field)))
+
+        if enabled:
+            cached = get_many([(p, k) for _, _, p, k in keys])
+        else:
+            cached = {}
+
+        misses = []
+        aggregates = {}
+
+        for field, method, proxy, key in keys:
+            if key in cached:
+                output[field.pk][method] = cached[key]
+                continue
+
+            if method not in PREFETCH_AGGREGATES:
+                if enabled:
+                    output[field.pk][method] = proxy.set_missing(field,
+                                                                 key=key)
+                else:
+                    output[field.pk][method] = proxy.func(field)
+
+                continue
+
+            misses.append((field, method, proxy, key))
+
+            if method in ('avg', 'sum') and field.simple_type != 'number':
+                output[field.pk][method] = None
+            else:
+                aggregates.setdefault(field.model, []).append(
+                    (field, method))
+
+        for model, pairs in aggregates.items():
+            kwargs = {}
+
+            for i, (field, method) in enumerate(pairs):
+                aggregate = PREFETCH_AGGREGATES[method]
+                kwargs['agg{0}'.format(i)] = aggregate(field.field.name)
+
+            result = model.objects.aggregate(**kwargs)
+
+            for i, (field, method) in enumerate(pairs):
+                output[field.pk][method] = result['agg{0}'.format(i)]
+
+        if enabled and misses:
+            set_many([(p, k, output[f.pk][m]) for f, m, p, k in misses])
+
+        return output
+
 
 class DataConceptManager(PublishedManager, DataConceptSearchMixin):
     "Manager for the `DataConcept` model."
@@ -2,7 +2,7 @@ import logging
 import random
 import jsonfield
 from datetime import datetime
-from django.db import models
+from django.db import models, connections
 from django.db.models import Count
 from django.contrib.sites.models import Site
 from django.contrib.auth.models import User
@@ -15,13 +15,15 @@ from avocado.core import utils
 from avocado.core.structures import ChoicesDict
 from avocado.core.models import Base, BasePlural, PublishArchiveMixin
 from avocado.core.cache import post_save_cache, pre_delete_uncache, \
-    cached_method
+    cached_method, cached_count, FieldMemo
+from avocado.core.cache.proxy import set_many
 from avocado.conf import settings
 from avocado import managers, history
 from avocado.query.translators import registry as translators
 from avocado.query.operators import registry as operators
 from avocado.query import oldparsers as parsers
 from avocado.stats.agg import Aggregator
+from avocado.stats.histogram import histogram
 from avocado import formatters
 
 
@@ -30,6 +32,21 @@ __all__ = ('DataCategory', 'DataConcept', 'DataField',
 
 log = logging.getLogger(__name__)
 
+# Number of seconds the previous output of the expensive data methods is
+# served while one process recomputes it after a `data_version` change.
+STALE_TIMEOUT = 60 * 60 * 24
+
+# Maximum number of values looked up per query by `DataField.get_labels`.
+LABEL_LOOKUP_BATCH_SIZE = 500
+
+
+def _build_label_index(field):
+    return dict(zip(field.values(), field.labels()))
+
+
+# Process-local value/label index of each field.
+_label_indexes = FieldMemo(_build_label_index)
+
 
 class DataCategory(Base, PublishArchiveMixin):
     "A high-level organization for data concepts."
@@ -431,8 +448,14 @@ class DataField(BasePlural, PublishArchiveMixin):
         return bool(self.field.choices)
 
     # Data-related Cached Properties
-    # These may be cached until the underlying data changes
-    @cached_method(version='data_version')
+    # These may be cached until the underlying data changes.
+    #
+    # Values, labels and codes are zipped together by callers, so they are
+    # never served stale. A stale copy of one could be paired with a new
+    # copy of another and the misaligned pairs memoized under the new
+    # version, e.g. by `label_index`.
+    @cached_method(version='data_version', single_flight=True,
+                   stale_timeout=STALE_TIMEOUT)
     def size(self, queryset=None):
         "Returns the count of distinct values."
         if self._has_predefined_choices():
@@ -440,7 +463,7 @@ class DataField(BasePlural, PublishArchiveMixin):
 
         return self.values_list(queryset=queryset).count()
 
-    @cached_method(version='data_version')
+    @cached_method(version='data_version', single_flight=True)
     def values(self, queryset=None):
         "Returns a distinct list of values."
         if self._has_predefined_choices():
@@ -448,7 +471,7 @@ class DataField(BasePlural, PublishArchiveMixin):
 
         return tuple(self.values_list(queryset=queryset))
 
-    @cached_method(version='data_version')
+    @cached_method(version='data_version', single_flight=True)
     def labels(self, queryset=None):
         "Returns a distinct list of labels."
         if self._has_predefined_choices():
@@ -458,11 +481,11 @@ class DataField(BasePlural, PublishArchiveMixin):
         return tuple(
             smart_unicode(l) for l in self.labels_list(queryset=queryset))
 
-    @cached_method(version='data_version')
+    @cached_method(version='data_version', single_flight=True)
     def codes(self, queryset=None):
         "Returns a distinct set of coded values for this field"
         if self._has_predefined_choices():
-            return tuple(range(self.size(queryset=queryset)))
+            return tuple(range(len(self.field.choices)))
 
         if self.code_field:
             return tuple(self.codes_list(queryset=queryset))
@@ -472,6 +495,52 @@ class DataField(BasePlural, PublishArchiveMixin):
         return ChoicesDict(zip(
             self.values(queryset=queryset), self.labels(queryset=queryset)))
 
+    def label_index(self):
+        """Returns a dict of values to labels for this field.
+
+        The dict is memoized per process until the `data_version` of the
+        field changes, so unlike `value_labels` it must not be modified.
+        """
+        return _label_indexes.get(self)
+
+    def get_labels(self, values, queryset=None):
+        """Returns a dict of labels for `values`. Only the labels of these
+        values are fetched, rather than every label of the field. Values
+        without a label are labeled as themselves like in `get_label`.
+        """
+        values = set(values)
+        labels = {}
+
+        if self._has_predefined_choices():
+            choices = dict(self.field.choices)
+
+            for value in values:
+                if value in choices:
+                    labels[value] = smart_unicode(choices[value])
+        elif self.label_field != self.field:
+            value_field = self.value_field.name
+            label_field = self.label_field.name
+            lookup = [v for v in values if v is not None]
+
+            if queryset is None:
+                queryset = self.model.objects.all()
+
+            queryset = queryset.values_list(value_field, label_field)\
+                .order_by().distinct()
+
+            for i in xrange(0, len(lookup), LABEL_LOOKUP_BATCH_SIZE):
+                batch = lookup[i:i + LABEL_LOOKUP_BATCH_SIZE]
+                filters = {u'{0}__in'.format(value_field): batch}
+
+                for value, label in queryset.filter(**filters):
+                    labels.setdefault(value, smart_unicode(label))
+
+        for value in values:
+            if value not in labels:
+                labels[value] = smart_unicode(value)
+
+        return labels
+
     def coded_labels(self, queryset=None):
         "Returns a distinct set of code/label pairs for this field."
         codes = self.codes(queryset=queryset)
@@ -564,6 +633,55 @@ class DataField(BasePlural, PublishArchiveMixin):
         return nulls / float(count)
 
     @cached_method(version='data_version')
+    def stats(self, queryset=None):
+        """Returns the aggregations of the individual data methods and the
+        number of null values computed in a single query.
+
+        The output of the individual cached methods is populated as well,
+        e.g. `min(queryset=queryset)` will not hit the database after this.
+        """
+        names = ['rows', 'count', 'min', 'max']
+
+        if self.simple_type == 'number':
+            names.extend(['avg', 'sum'])
+
+            if queryset is not None:
+                using = queryset.db
+            else:
+                using = self.model.objects.all().db
+
+            if connections[using].features.supports_stddev:
+                names.extend(['stddev', 'variance'])
+
+        stats = Aggregator(self.field, queryset=queryset).stats(*names)
+
+        rows = stats.pop('rows')
+        stats['nulls'] = rows - stats['count']
+
+        # No data, 100% sparsity
+        if rows == 0:
+            stats['sparsity'] = 1.0
+        else:
+            stats['sparsity'] = stats['nulls'] / float(rows)
+
+        if settings.DATA_CACHE_ENABLED:
+            kwargs = {'queryset': queryset}
+            items = []
+
+            for name, value in stats.items():
+                method = getattr(self.__class__, name, None)
+                proxy = getattr(method, 'cache_proxy', None)
+
+                if proxy is not None:
+                    key = proxy.cache_key(self, kwargs=kwargs)
+                    items.append((proxy, key, value))
+
+            set_many(items)
+
+        return stats
+
+    @cached_method(version='data_version', single_flight=True,
+                   stale_timeout=STALE_TIMEOUT)
     def dist(self, queryset=None):
         if queryset is None:
             queryset = self.model.objects.all()
@@ -575,6 +693,19 @@ class DataField(BasePlural, PublishArchiveMixin):
 
         return tuple(queryset)
 
+    @cached_method(version='data_version')
+    def histogram(self, bins=10, queryset=None, quantiles=False):
+        """Returns the `edges` and `counts` of the values binned into
+        `bins` equal-width bins or quantiles. Only applies to quantitative
+        data.
+        """
+        if self.simple_type == 'number':
+            if queryset is None:
+                queryset = self.model.objects.all()
+
+            return histogram(queryset, self.value_field.name, bins=bins,
+                             quantiles=quantiles)
+
     # Translator Convenience Methods
     @property
     def operators(self):
@@ -815,13 +946,15 @@ class DataContext(Base):
         "Validate `attrs` as a context."
         return parsers.datacontext.validate(attrs, **context)
 
-    @cached_method(version='modified')
     def count(self, *args, **kwargs):
-        return self.apply(*args, **kwargs).values('pk').count()
+        # Cached by the compiled query, so it is shared by equivalent
+        # contexts and not invalidated by changes to the name and such.
+        return cached_count(self.apply(*args, **kwargs).values('pk'))
 
     def parse(self, tree=None, **context):
         "Returns a parsed node for this context."
-        return parsers.datacontext.parse(self.json, tree=tree, **context)
+        return parsers.datacontext.cached_parse(self.json, tree=tree,
+                                                **context)
 
     def apply(self, queryset=None, tree=None, **context):
         "Applies this context to a QuerySet."
@@ -904,7 +1037,8 @@ class DataView(Base):
 
     def parse(self, tree=None, **context):
         "Returns a parsed node for this view."
-        return parsers.dataview.parse(self.json, tree=tree, **context)
+        return parsers.dataview.cached_parse(self.json, tree=tree,
+                                             **context)
 
     def apply(self, queryset=None, tree=None, include_pk=True, **context):
         "Applies this context to a QuerySet."
@@ -1047,9 +1181,8 @@ class DataQuery(Base):
         "Validates `attrs` as a query."
         return parsers.dataquery.validate(attrs, **context)
 
-    @cached_method(version='modified')
     def count(self, *args, **kwargs):
-        return self.apply(*args, **kwargs).count()
+        return cached_count(self.apply(*args, **kwargs))
 
     def parse(self, tree=None, **context):
         "Returns a parsed node for this query."
@@ -1154,6 +1287,15 @@ pre_delete.connect(pre_delete_uncache, sender=DataField)
 pre_delete.connect(pre_delete_uncache, sender=DataConcept)
 pre_delete.connect(pre_delete_uncache, sender=DataCategory)
 
+# Clear parsed contexts and views when the metadata they reference changes
+post_save.connect(parsers.cache.clear, sender=DataField)
+post_save.connect(parsers.cache.clear, sender=DataConcept)
+post_save.connect(parsers.cache.clear, sender=DataConceptField)
+
+pre_delete.connect(parsers.cache.clear, sender=DataField)
+pre_delete.connect(parsers.cache.clear, sender=DataConcept)
+pre_delete.connect(parsers.cache.clear, sender=DataConceptField)
+
 # Register with history API
 if settings.HISTORY_ENABLED:
     history.register(DataContext, fields=('name', 'description', 'json'))
@@ -1,3 +1,4 @@
+from . import cache         # noqa
 from . import datacontext   # noqa
 from . import dataview      # noqa
 from . import dataquery     # noqa
@@ -0,0 +1,74 @@
+"""Process-local cache of parsed context and view nodes.
+
+Nodes resolve the fields and concepts referenced by the tree and run the
+translators lazily, memoizing the results. Caching the nodes means repeated
+queries for the same tree, e.g. counting and paging, only do this once. Keys
+include the `modified` timestamps of the referenced metadata and the
+`data_version` of the fields, so changes made in other processes are picked
+up, and the cache is cleared when the metadata is saved or deleted in this
+process.
+
+The versions are queried on every lookup, so a hit costs one query. This
+replaces the queries for resolving the fields and concepts of the tree, but
+the cache only pays off if translating the conditions is more expensive.
+"""
+import json
+import hashlib
+from avocado.conf import settings
+from avocado.core.structures import LRUCache
+
+_nodes = None
+
+
+def get_cache():
+    "Returns the parse cache or None if it is disabled."
+    global _nodes
+
+    size = settings.QUERY_PARSE_CACHE_SIZE
+
+    if not size:
+        return
+
+    if _nodes is None or _nodes.maxsize != size:
+        _nodes = LRUCache(maxsize=size)
+
+    return _nodes
+
+
+def _tree_key(tree):
+    # Model classes are referenced by label, aliases as is.
+    if hasattr(tree, '_meta'):
+        return '{0}.{1}'.format(tree._meta.app_label,
+                                tree._meta.object_name)
+
+    return tree
+
+
+def cache_key(label, attrs, tree, versions):
+    "Returns a key for the canonical form of the tree and its versions."
+    data = json.dumps([label, attrs, _tree_key(tree), versions],
+                      sort_keys=True, default=unicode)
+
+    return hashlib.md5(data).hexdigest()
+
+
+def get_node(key):
+    cache = get_cache()
+
+    if cache is not None:
+        return cache.get(key)
+
+
+def set_node(key, node):
+    cache = get_cache()
+
+    if cache is not None:
+        cache.set(key, node)
+
+
+def clear(sender=None, **kwargs):
+    """Clears the parse cache. This is connected to the save and delete
+    signals of the metadata models.
+    """
+    if _nodes is not None:
+        _nodes.clear()
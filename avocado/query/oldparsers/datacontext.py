@@ -1,10 +1,14 @@
+from operator import or_
 from warnings import warn
 from django.db import models
+from django.db.models import Q
 from avocado.core import utils
+from avocado.query.resolver import Resolver
 from modeltree.tree import trees
 from django.db.models.query import QuerySet
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.utils.encoding import smart_unicode
+from . import cache
 
 AND = 'AND'
 OR = 'OR'
@@ -67,7 +71,7 @@ class Node(object):
 class Condition(Node):
     "Contains information for a single query condition."
     def __init__(self, value, operator, id=None, field=None,
-                 concept=None, **context):
+                 concept=None, resolver=None, **context):
 
         if field:
             self.field_key = field
@@ -79,23 +83,23 @@ class Condition(Node):
         self.concept_key = concept
         self.operator = operator
         self.value = value
+        self.resolver = resolver or Resolver()
 
         super(Condition, self).__init__(**context)
 
     @property
     def _meta(self):
-        if not hasattr(self, '__meta'):
-            self.__meta = self.field.translate(operator=self.operator,
-                                               value=self.value,
-                                               tree=self.tree, **self.context)
-        return self.__meta
+        if not hasattr(self, '_translation'):
+            self._translation = self.field.translate(
+                operator=self.operator, value=self.value, tree=self.tree,
+                **self.context)
+        return self._translation
 
     @property
     def concept(self):
         if not hasattr(self, '_concept'):
             if self.concept_key:
-                from avocado.models import DataConcept
-                self._concept = DataConcept.objects.get(id=self.concept_key)
+                self._concept = self.resolver.get_concept(self.concept_key)
             else:
                 self._concept = None
         return self._concept
@@ -103,14 +107,8 @@ class Condition(Node):
     @property
     def field(self):
         if not hasattr(self, '_field'):
-            from avocado.models import DataField
-            # Parse to get into a consistent format
-            field_key = utils.parse_field_key(self.field_key)
-
-            if self.concept:
-                self._field = self.concept.fields.get(**field_key)
-            else:
-                self._field = DataField.objects.get(**field_key)
+            self._field = self.resolver.get_field(self.field_key,
+                                                  concept=self.concept)
         return self._field
 
     @property
@@ -205,6 +203,14 @@ def validate(attrs, **context):
     if not attrs:
         return None
 
+    # The fields and concepts of all conditions are loaded up front.
+    return _validate(attrs, Resolver.for_tree(attrs), **context)
+
+
+def _validate(attrs, resolver, **context):
+    if not attrs:
+        return None
+
     if type(attrs) is not dict:
         raise ValidationError('Object must be of type dict')
 
@@ -231,26 +237,40 @@ def validate(attrs, **context):
                           .format(attrs['id']))
 
     elif is_condition(attrs):
-        from avocado.models import DataField, DataConcept
         field_key = attrs.get('field', attrs.get('id'))
-        # Parse to get into a consistent format
-        field_key = utils.parse_field_key(field_key)
 
         try:
+            concept = None
+
             if 'concept' in attrs:
-                concept = DataConcept.objects.get(id=attrs['concept'])
-                field = concept.fields.get(**field_key)
-            else:
-                field = DataField.objects.get(**field_key)
+                concept = resolver.get_concept(attrs['concept'])
+
+            field = resolver.get_field(field_key, concept=concept)
             field.validate(operator=attrs['operator'], value=attrs['value'])
-            node = parse(attrs, **context)
+            node = _parse(attrs, resolver, **context)
             attrs['language'] = node.language['language']
 
             value = node._meta['cleaned_data']['value']
             cleaned = None
+            value_labels = None
 
-            if field.enumerable or field.simple_type == 'key':
-                value_labels = field.value_labels()
+            if field.simple_type == 'key':
+                # Keys may have many values, so only the labels of the
+                # values in the condition are fetched.
+                if isinstance(value, QuerySet):
+                    values = [val.pk for val in value]
+                elif isinstance(value, (list, tuple)):
+                    values = value
+                elif isinstance(value, models.Model):
+                    values = [value.pk]
+                else:
+                    values = [value]
+
+                value_labels = field.get_labels(values)
+            elif field.enumerable:
+                value_labels = field.label_index()
+
+            if value_labels is not None:
 
                 if isinstance(value, QuerySet):
                     cleaned = [{
@@ -300,7 +320,8 @@ def validate(attrs, **context):
         if attrs['type'] not in LOGICAL_OPERATORS:
             enabled = False
         else:
-            map(lambda x: validate(x, **context), attrs['children'])
+            map(lambda x: _validate(x, resolver, **context),
+                attrs['children'])
     else:
         enabled = False
         errors.append('Unknown node type')
@@ -319,6 +340,11 @@ def validate(attrs, **context):
 
 
 def parse(attrs, **context):
+    # The fields and concepts of all conditions are loaded up front.
+    return _parse(attrs, Resolver.for_tree(attrs), **context)
+
+
+def _parse(attrs, resolver, **context):
     if not attrs or attrs.get('enabled') is False:
         node = Node(**context)
     elif is_composite(attrs):
@@ -332,8 +358,65 @@ def parse(attrs, **context):
     elif is_condition(attrs):
         node = Condition(operator=attrs['operator'], value=attrs['value'],
                          id=attrs.get('id'), field=attrs.get('field'),
-                         **context)
+                         resolver=resolver, **context)
     else:
         node = Branch(type=attrs['type'], **context)
-        node.children = map(lambda x: parse(x, **context), attrs['children'])
+        node.children = map(lambda x: _parse(x, resolver, **context),
+                            attrs['children'])
+    return node
+
+
+def _field_keys(attrs, keys):
+    """Collects the field keys of the enabled conditions in `attrs`. Returns
+    false if the tree contains a composite which cannot be cached since the
+    referenced context may change.
+    """
+    if not attrs or attrs.get('enabled') is False:
+        return True
+
+    if is_composite(attrs):
+        return False
+
+    if is_condition(attrs):
+        keys.append(attrs.get('field', attrs.get('id')))
+        return True
+
+    if is_branch(attrs):
+        for child in attrs['children']:
+            if not _field_keys(child, keys):
+                return False
+
+    return True
+
+
+def cached_parse(attrs, tree=None, **context):
+    """Parses `attrs` like `parse`, but returns a shared node from the parse
+    cache when the tree and the fields it references have not changed.
+
+    Trees with composites and parses with additional context are not cached.
+    """
+    keys = []
+
+    if context or cache.get_cache() is None or \
+            not _field_keys(attrs, keys):
+        return parse(attrs, tree=tree, **context)
+
+    versions = []
+
+    if keys:
+        from avocado.models import DataField
+
+        lookups = [Q(**utils.parse_field_key(k)) for k in keys]
+        # The data version is included since translators may depend on
+        # the data, which does not change the modified time.
+        versions = sorted(DataField.objects.filter(reduce(or_, lookups))
+                          .values_list('pk', 'modified', 'data_version'))
+
+    key = cache.cache_key('datacontext', attrs, tree, versions)
+    node = cache.get_node(key)
+
+    if node is None:
+        node = parse(attrs, tree=tree)
+        cache.set_node(key, node)
+
     return node
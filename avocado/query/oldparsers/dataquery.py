@@ -39,11 +39,11 @@ def parse(attrs, tree=None, **context):
         return Node(**context)
 
     datacontext_attrs = attrs.get('context', {})
-    datacontext_node = \
-        datacontext_parser.parse(datacontext_attrs, tree=tree, **context)
+    datacontext_node = datacontext_parser.cached_parse(
+        datacontext_attrs, tree=tree, **context)
 
     dataview_attrs = attrs.get('view', {})
     dataview_node = \
-        dataview_parser.parse(dataview_attrs, tree=tree, **context)
+        dataview_parser.cached_parse(dataview_attrs, tree=tree, **context)
 
     return Node(datacontext_node, dataview_node, **context)
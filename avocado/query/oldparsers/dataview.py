@@ -4,6 +4,7 @@ try:
 except ImportError:
     from ordereddict import OrderedDict
 from modeltree.tree import trees
+from . import cache
 
 
 SORT_DIRECTIONS = ('asc', 'desc')
@@ -14,6 +15,8 @@ class Node(object):
         self.facets = facets or []
         self.tree = context.pop('tree', None)
         self.context = context
+        self._concepts = {}
+        self._fields = {}
 
     @property
     def concept_ids(self):
@@ -57,19 +60,35 @@ class Node(object):
         if not ids:
             return []
 
-        from avocado.models import DataConcept
+        # Memoized since nodes may be shared through the parse cache.
+        key = tuple(ids)
+
+        if key not in self._concepts:
+            from avocado.models import DataConcept
+
+            concepts = list(DataConcept.objects.filter(pk__in=ids))
+            concepts.sort(key=lambda o: ids.index(o.pk))
+            self._concepts[key] = concepts
 
-        concepts = list(DataConcept.objects.filter(pk__in=ids))
-        concepts.sort(key=lambda o: ids.index(o.pk))
-        return concepts
+        return list(self._concepts[key])
 
     def _get_fields_for_concepts(self, ids):
         "Returns an ordered list of fields for concept `ids`."
-        from avocado.models import DataConceptField
-
         if not ids:
             return OrderedDict()
 
+        key = tuple(ids)
+
+        if key not in self._fields:
+            self._fields[key] = self._query_fields_for_concepts(ids)
+
+        # Copied so callers cannot change the memoized groups.
+        return OrderedDict((pk, list(fields))
+                           for pk, fields in self._fields[key].items())
+
+    def _query_fields_for_concepts(self, ids):
+        from avocado.models import DataConceptField
+
         # Concept fields that are sorted by concept then order, but are not
         # in the original order defined in `ids`
         cfields = list(DataConceptField.objects.filter(concept__pk__in=ids)
@@ -284,3 +303,40 @@ def parse(facets, **context):
         facets = convert_legacy(facets)
 
     return Node(facets, **context)
+
+
+def cached_parse(facets, tree=None, **context):
+    """Parses `facets` like `parse`, but returns a shared node from the parse
+    cache when the view and the concepts it references have not changed.
+
+    Parses with additional context are not cached.
+    """
+    if context or cache.get_cache() is None:
+        return parse(facets, tree=tree, **context)
+
+    versions = []
+
+    if facets:
+        from avocado.models import DataConcept
+
+        if isinstance(facets, dict):
+            ids = [pk for pk, _ in facets.get('ordering', [])] + \
+                list(facets.get('columns', []))
+        else:
+            ids = [f['concept'] for f in facets if 'concept' in f]
+
+        # The modified times of the concepts, their memberships and fields
+        # and the data versions of the fields in a single query.
+        versions = sorted(DataConcept.objects.filter(pk__in=ids).values_list(
+            'pk', 'modified', 'concept_fields__modified',
+            'concept_fields__field__modified',
+            'concept_fields__field__data_version'))
+
+    key = cache.cache_key('dataview', facets, tree, versions)
+    node = cache.get_node(key)
+
+    if node is None:
+        node = parse(facets, tree=tree)
+        cache.set_node(key, node)
+
+    return node
@@ -2,7 +2,8 @@ import logging
 from django.core.exceptions import ValidationError
 from avocado.query import operators
 from avocado.query.validators import Validator, FieldValidator
-from avocado.models import DataContext
+from avocado.models import DataContext, DataConcept, DataField
+from avocado.query.resolver import Resolver
 
 __all__ = ('BranchParser', 'ConditionParser', 'CompositeParser', 'TreeParser')
 
@@ -190,9 +191,27 @@ class TreeParser(Validator):
         'invalid': 'invalid data',
     }
 
+    def get_resolver(self):
+        "Returns a resolver for the fields and concepts of the whole tree."
+        if 'user' in self.context:
+            user = self.context['user']
+
+            return Resolver.for_tree(
+                self.data, fields=DataField.objects.published(user=user),
+                concepts=DataConcept.objects.published(user=user))
+
+        return Resolver.for_tree(self.data)
+
     def validate(self):
         parser = get_parser(self.data)
         if parser:
-            self.cleaned_data['tree'] = parser(self.data, **self.context)
+            context = self.context.copy()
+
+            # Conditions share a resolver rather than each querying for
+            # their field and concept.
+            if 'resolver' not in context:
+                context['resolver'] = self.get_resolver()
+
+            self.cleaned_data['tree'] = parser(self.data, **context)
         else:
             self.error('invalid')
@@ -53,8 +53,15 @@ class QueryProcessor(object):
 
         return exporter
 
-    def get_iterable(self, offset=None, limit=None, queryset=None, **kwargs):
-        "Returns an iterable that can be used by an exporter."
+    def get_iterable(self, offset=None, limit=None, queryset=None,
+                     stream=False, fetch_size=None, **kwargs):
+        """Returns an iterable that can be used by an exporter.
+
+        If `stream` is true, rows are fetched from a server-side cursor in
+        batches of `fetch_size` rather than the whole result set being loaded
+        into memory. This is recommended for large exports. Streaming
+        requires Django 1.8 or later, otherwise rows are fetched as usual.
+        """
         if queryset is None:
             queryset = self.get_queryset(**kwargs)
 
@@ -72,6 +79,11 @@ class QueryProcessor(object):
 
         compiler = queryset.query.get_compiler(queryset.db)
 
+        if stream:
+            # Imported here to prevent a circular import.
+            from avocado.query.utils import stream_results
+            return stream_results(compiler, fetch_size=fetch_size)
+
         return compiler.results_iter()
 
 
@@ -0,0 +1,173 @@
+from operator import or_
+from django.db.models import Q
+from avocado.core import utils
+
+
+def _lookup_key(lookup):
+    return tuple(sorted(lookup.items()))
+
+
+def _matches(field, lookup):
+    for name, value in lookup.items():
+        if getattr(field, name) != value:
+            return False
+    return True
+
+
+def collect(attrs, field_keys, concept_ids):
+    """Collects the field keys and concept ids referenced by the conditions
+    in a context tree. Composites are not followed.
+    """
+    if not isinstance(attrs, dict):
+        return
+
+    if 'operator' in attrs and 'value' in attrs:
+        key = attrs.get('field', attrs.get('id'))
+
+        if key is not None:
+            field_keys.append(key)
+
+        if attrs.get('concept') is not None:
+            concept_ids.append(attrs['concept'])
+
+    for child in attrs.get('children') or ():
+        collect(child, field_keys, concept_ids)
+
+
+class Resolver(object):
+    """Resolves the fields and concepts referenced by a context tree.
+
+    Rather than a query per condition, the referenced fields and concepts
+    are loaded with one query each when the resolver is created.
+    `get_field` and `get_concept` behave like `QuerySet.get`, raising
+    `DoesNotExist` or `MultipleObjectsReturned`. Keys that were not
+    collected up front fall back to a query.
+
+    The optional `fields` and `concepts` querysets restrict the lookups,
+    e.g. to the published objects. As with `concept.fields`, fields looked
+    up for a concept are only restricted to the concept's fields.
+    """
+    def __init__(self, field_keys=(), concept_ids=(), fields=None,
+                 concepts=None):
+        from avocado.models import DataField, DataConcept, DataConceptField
+
+        self.field_queryset = fields
+        self.concept_queryset = concepts
+
+        if fields is None:
+            fields = DataField.objects.all()
+
+        if concepts is None:
+            concepts = DataConcept.objects.all()
+
+        self._lookups = set()
+        self._fields = []
+        self._allowed = None
+        self._concepts = {}
+        self._memberships = set()
+
+        pks = set()
+        lookups = []
+
+        for key in field_keys:
+            lookup = utils.parse_field_key(key)
+            self._lookups.add(_lookup_key(lookup))
+
+            if lookup.keys() == ['pk']:
+                pks.add(lookup['pk'])
+            else:
+                lookups.append(Q(**lookup))
+
+        if pks:
+            lookups.append(Q(pk__in=pks))
+
+        ids = set()
+
+        for pk in concept_ids:
+            try:
+                ids.add(int(pk))
+            except (TypeError, ValueError):
+                pass
+
+        if lookups:
+            queryset = DataField.objects.filter(reduce(or_, lookups))
+            self._fields = list(queryset)
+
+            # Fields looked up for a concept are not restricted by the
+            # queryset, so the allowed subset is loaded separately.
+            if self.field_queryset is not None and self._fields:
+                self._allowed = set(fields.filter(
+                    pk__in=[f.pk for f in self._fields])
+                    .values_list('pk', flat=True))
+
+        if ids:
+            self._concepts = concepts.in_bulk(ids)
+            self._memberships = set(DataConceptField.objects
+                                    .filter(concept__pk__in=ids)
+                                    .values_list('concept', 'field'))
+
+        self.concept_ids = ids
+
+    @classmethod
+    def for_tree(cls, attrs, **kwargs):
+        "Returns a resolver for the fields and concepts referenced in `attrs`."
+        field_keys = []
+        concept_ids = []
+
+        collect(attrs, field_keys, concept_ids)
+
+        return cls(field_keys, concept_ids, **kwargs)
+
+    def get_concept(self, pk):
+        from avocado.models import DataConcept
+
+        pk = int(pk)
+
+        if pk not in self.concept_ids:
+            concepts = self.concept_queryset
+
+            if concepts is None:
+                concepts = DataConcept.objects.all()
+
+            return concepts.get(pk=pk)
+
+        try:
+            return self._concepts[pk]
+        except KeyError:
+            raise DataConcept.DoesNotExist('DataConcept matching query '
+                                           'does not exist.')
+
+    def get_field(self, key, concept=None):
+        from avocado.models import DataField
+
+        lookup = utils.parse_field_key(key)
+
+        if _lookup_key(lookup) not in self._lookups or \
+                (concept is not None and concept.pk not in self.concept_ids):
+            if concept is not None:
+                fields = concept.fields.all()
+            elif self.field_queryset is not None:
+                fields = self.field_queryset
+            else:
+                fields = DataField.objects.all()
+
+            return fields.get(**lookup)
+
+        matches = [f for f in self._fields if _matches(f, lookup)]
+
+        if concept is not None:
+            matches = [f for f in matches
+                       if (concept.pk, f.pk) in self._memberships]
+        elif self._allowed is not None:
+            matches = [f for f in matches if f.pk in self._allowed]
+
+        if not matches:
+            raise DataField.DoesNotExist('DataField matching query does not '
+                                         'exist.')
+
+        if len(matches) > 1:
+            raise DataField.MultipleObjectsReturned(
+                'get() returned more than one DataField -- it returned {0}!'
+                .format(len(matches)))
+
+        return matches[0]
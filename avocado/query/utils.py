@@ -1,8 +1,10 @@
+import uuid
 import logging
 
 import django
 from django.core.cache import get_cache
 from django.db import connections, DEFAULT_DB_ALIAS, DatabaseError
+from django.db.models.sql.datastructures import EmptyResultSet
 from django_rq import get_queue
 
 from avocado.conf import settings
@@ -15,6 +17,10 @@ logger = logging.getLogger(__name__)
 DEFAULT_LIMIT = 20
 TEMP_DB_ALIAS_PREFIX = '_db:{0}'
 
+# Streaming from a server-side cursor requires `results_iter` to accept the
+# fetched rows, which was added in Django 1.8.
+SUPPORTS_STREAMING = django.VERSION >= (1, 8)
+
 
 def ensure_connection(conn):
     if django.VERSION < (1, 6):
@@ -142,6 +148,88 @@ def _get_backend_pid(conn):
     logger.warn('getting PIDs for {0} is not supported'.format(engine))
 
 
+def server_side_cursor(conn):
+    """Returns a cursor that keeps the result set on the database server.
+
+    Rows are only transferred to the client as they are fetched which keeps
+    memory bounded for large result sets. PostgreSQL uses a named cursor and
+    MySQL an unbuffered cursor. Other backends use a standard cursor.
+    """
+    engine = conn.settings_dict['ENGINE']
+
+    ensure_connection(conn)
+
+    if engine == 'django.db.backends.postgresql_psycopg2':
+        name = 'avocado_{0}'.format(uuid.uuid4().hex)
+
+        # Named cursors are declared in a transaction. When not in one, the
+        # cursor must be held to survive the implicit commit.
+        return conn.connection.cursor(name,
+                                      withhold=conn.connection.autocommit)
+
+    if engine == 'django.db.backends.mysql':
+        from MySQLdb.cursors import SSCursor
+        return conn.connection.cursor(SSCursor)
+
+    return conn.cursor()
+
+
+def stream_results(compiler, fetch_size=None):
+    """Executes a compiled query using a server-side cursor and yields the
+    rows as they are fetched in batches of `fetch_size`.
+
+    The query is executed on the compiler's connection, so a queryset that
+    has been isolated with `isolate_queryset` can be canceled using
+    `cancel_query` while rows are being streamed.
+
+    Prior to Django 1.8, the rows are fetched by the compiler as usual,
+    which may load the whole result set into memory.
+    """
+    if not SUPPORTS_STREAMING:
+        for row in compiler.results_iter():
+            yield row
+        return
+
+    if fetch_size is None:
+        fetch_size = settings.STREAM_FETCH_SIZE
+
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return
+
+    if not sql:
+        return
+
+    conn = compiler.connection
+    col_count = compiler.col_count
+    cursor = server_side_cursor(conn)
+
+    def fetch():
+        while True:
+            with conn.wrap_database_errors:
+                rows = cursor.fetchmany(fetch_size)
+
+            if not rows:
+                break
+
+            yield [r[0:col_count] for r in rows]
+
+    try:
+        with conn.wrap_database_errors:
+            cursor.execute(sql, params)
+
+        for row in compiler.results_iter(results=fetch()):
+            yield row
+    finally:
+        # The cursor may already be gone if the query was canceled.
+        try:
+            with conn.wrap_database_errors:
+                cursor.close()
+        except DatabaseError:
+            pass
+
+
 def _conn_info(name):
     temp_db = TEMP_DB_ALIAS_PREFIX.format(name)
     cache = get_cache(settings.QUERY_CACHE)
@@ -377,6 +465,8 @@ def get_result_rows(context, view, query_options, evaluate_rows=False,
                 * export_type: Export type to use for result rows.
                 * reader: Reader type to use when exporting, see
                     export._base.BaseExporter.readers for available readers.
+                * stream: Fetch rows from a server-side cursor rather than
+                    loading the result set into memory.
 
     Kwargs:
         evaluate_rows (default=False): When this is True, the generator
@@ -412,6 +502,7 @@ def get_result_rows(context, view, query_options, evaluate_rows=False,
     tree = query_options.get('tree')
     export_type = query_options.get('export_type') or 'html'
     reader = query_options.get('reader')
+    stream = query_options.get('stream', False)
 
     if page is not None:
         page = int(page)
@@ -465,14 +556,15 @@ def get_result_rows(context, view, query_options, evaluate_rows=False,
     view_node = view.parse()
 
     if filter(order_only, view_node.facets):
-        iterable = processor.get_iterable(queryset=queryset)
+        iterable = processor.get_iterable(queryset=queryset, stream=stream)
         rows = exporter.manual_read(iterable,
                                     offset=offset,
                                     limit=limit)
     else:
         iterable = processor.get_iterable(queryset=queryset,
                                           limit=limit,
-                                          offset=offset)
+                                          offset=offset,
+                                          stream=stream)
         method = exporter.reader(reader)
         rows = method(iterable)
 
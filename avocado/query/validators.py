@@ -153,12 +153,17 @@ class FieldValidator(Validator):
         except ValueError:
             self.error('concept_wrong_format')
 
-        if 'user' in self.context:
-            queryset = DataConcept.objects.published(user=self.context['user'])
-        else:
-            queryset = DataConcept.objects.all()
-
         try:
+            # Use the fields and concepts loaded for the whole tree.
+            if 'resolver' in self.context:
+                return self.context['resolver'].get_concept(kwargs['pk'])
+
+            if 'user' in self.context:
+                queryset = DataConcept.objects.published(
+                    user=self.context['user'])
+            else:
+                queryset = DataConcept.objects.all()
+
             return queryset.get(**kwargs)
         except DataConcept.DoesNotExist:
             self.error('concept_does_not_exist')
@@ -193,6 +198,10 @@ class FieldValidator(Validator):
             queryset = DataField.objects.all()
 
         try:
+            if 'resolver' in self.context:
+                return self.context['resolver'].get_field(field,
+                                                          concept=concept)
+
             return queryset.get(**kwargs)
         except DataField.DoesNotExist:
             if concept:
@@ -1,2 +1,3 @@
 from . import kmeans    # noqa
 from . import agg       # noqa
+from . import histogram  # noqa
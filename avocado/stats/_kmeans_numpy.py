@@ -0,0 +1,295 @@
+"""NumPy implementations of the functions in `avocado.stats.kmeans`.
+
+The functions take and return the same types as their pure-Python
+counterparts, i.e. lists rather than arrays, so they can be swapped in
+transparently. See the pure-Python functions for the documentation.
+"""
+import math
+import random
+import numpy as np
+from avocado.stats.kmeans import iter_batches, is_reiterable
+
+# Maximum number of elements of the intermediate (points x centroids x
+# dimensions) array built when computing distances. Points are processed in
+# chunks to stay within this bound.
+CHUNK_ELEMENTS = 2 ** 22
+
+
+def _as_array(points):
+    "Returns a 2-dimensional float array and whether the points are nested."
+    if len(points) > 0 and not hasattr(points[0], '__iter__') and \
+            not hasattr(points[0], '__getitem__'):
+        return np.asarray(points, dtype=float).reshape(-1, 1), False
+
+    try:
+        array = np.asarray(points, dtype=float)
+    except ValueError:
+        raise ValueError("Points must have the same number of dimensions.")
+
+    if array.ndim != 2:
+        raise ValueError("Points must have the same number of dimensions.")
+
+    return array, True
+
+
+def _to_list(array, nested):
+    "Converts an array of points back into the list form of the points."
+    if nested:
+        return array.tolist()
+
+    return array[:, 0].tolist()
+
+
+def _std(array):
+    std = array.std(axis=0)
+
+    # Dimensions with the same values are normalized to 0.
+    std[std == 0] = np.inf
+
+    return std
+
+
+def _mean(values):
+    # Summed sequentially, as the pure-Python implementation does, rather
+    # than pairwise so the results are the same.
+    return sum(values.tolist()) / float(len(values))
+
+
+def normalize(points):
+    array, nested = _as_array(points)
+
+    return _to_list(array / _std(array), nested)
+
+
+def _compute_clusters(array, centroids):
+    "Returns the cluster indexes and squared distances as arrays."
+    n = len(array)
+    k, d = centroids.shape
+
+    clusters = np.empty(n, dtype=int)
+    distances = np.empty(n, dtype=float)
+
+    chunk = max(1, CHUNK_ELEMENTS // (k * d))
+
+    for start in xrange(0, n, chunk):
+        # (chunk, 1, d) - (1, k, d) -> (chunk, k)
+        diff = array[start:start + chunk, np.newaxis, :] - \
+            centroids[np.newaxis, :, :]
+        totals = (diff * diff).sum(axis=2)
+
+        # The first index is used for ties.
+        indexes = totals.argmin(axis=1)
+        clusters[start:start + chunk] = indexes
+        distances[start:start + chunk] = \
+            totals[np.arange(len(indexes)), indexes]
+
+    return clusters, distances
+
+
+def compute_clusters(points, centroids):
+    if len(points) < 1:
+        raise ValueError("cluster requires at least one point.")
+    if len(centroids) < 1:
+        raise ValueError("cluster requires at least one centroid.")
+
+    array, _ = _as_array(points)
+    centroids, _ = _as_array(centroids)
+
+    if array.shape[1] != centroids.shape[1]:
+        raise ValueError('Points and centroids must have the same '
+                         'dimension(found {0} and {1} respectively)'.format(
+                             array.shape[1], centroids.shape[1]))
+
+    clusters, distances = _compute_clusters(array, centroids)
+
+    return clusters.tolist(), np.sqrt(distances).tolist()
+
+
+def _kmeans(array, nested, centroids, threshold):
+    "Runs k-means on the arrays and returns the centroids array and mean."
+    n, d = array.shape
+
+    mean_difference = float('Inf')
+    previous_mean_distance = None
+
+    while mean_difference > threshold:
+        if len(centroids) < 1:
+            raise ValueError("cluster requires at least one centroid.")
+
+        clusters, distances = _compute_clusters(array, centroids)
+        mean_distance = _mean(np.sqrt(distances))
+
+        if previous_mean_distance is not None:
+            mean_difference = previous_mean_distance - mean_distance
+
+        if mean_difference > threshold:
+            k = len(centroids)
+            sizes = np.bincount(clusters, minlength=k)
+
+            sums = np.empty((k, d))
+
+            for j in range(d):
+                sums[:, j] = np.bincount(clusters, weights=array[:, j],
+                                         minlength=k)
+
+            # Remove centroids of empty clusters. As with the pure-Python
+            # implementation, single dimension centroids at 0 are removed
+            # as well since they are falsy.
+            keep = sizes > 0
+            centroids = sums[keep] / sizes[keep, np.newaxis]
+
+            if not nested:
+                centroids = centroids[centroids[:, 0] != 0]
+
+        previous_mean_distance = mean_distance
+
+    return centroids, previous_mean_distance
+
+
+def kmeans(points, k_or_centroids, threshold=1e-5):
+    if len(points) < 1:
+        raise ValueError("points must contain at least 1 point.")
+
+    if hasattr(k_or_centroids, '__iter__'):
+        k = len(k_or_centroids)
+        initial_centroids = k_or_centroids
+    else:
+        k = k_or_centroids
+        initial_centroids = random.sample(points, k)
+
+    if k < 1:
+        raise ValueError("k must be >= 1.")
+
+    array, nested = _as_array(points)
+    centroids, _ = _as_array(list(initial_centroids))
+
+    centroids, mean_distance = _kmeans(array, nested, centroids, threshold)
+
+    return _to_list(centroids, nested), mean_distance
+
+
+def _find_outliers(array, nested, outlier_threshold):
+    # Median-like centroid from the midpoint of each sorted dimension.
+    midpoint_index = (len(array) - 1) / 2
+    centroid = np.sort(array, axis=0)[midpoint_index][np.newaxis, :]
+
+    centroids, _ = _kmeans(array, nested, centroid, 1e-5)
+    _, distances = _compute_clusters(array, centroids)
+    distances = np.sqrt(distances)
+
+    mean_distance = _mean(distances)
+
+    if mean_distance > 0:
+        return np.flatnonzero(
+            distances / mean_distance >= outlier_threshold).tolist()
+
+    return []
+
+
+def find_outliers(points, outlier_threshold=3, normalized=True):
+    array, nested = _as_array(points)
+
+    if not normalized:
+        array = array / _std(array)
+
+    return _find_outliers(array, nested, outlier_threshold)
+
+
+def kmeans_optm(points, k=None, outlier_threshold=3):
+    array, nested = _as_array(points)
+
+    if outlier_threshold:
+        outliers = _find_outliers(array / _std(array), nested,
+                                  outlier_threshold)
+
+        if outliers:
+            array = np.delete(array, outliers, axis=0)
+    else:
+        outliers = []
+
+    n = len(array)
+
+    k = k or int(math.sqrt(n / 2))
+
+    std = array.std(axis=0)
+    norm_array = array / _std(array)
+
+    # Initial centroids are evenly spaced over the sorted dimensions.
+    step = n / k
+    offset = step / 2
+    initial_centroids = np.sort(norm_array, axis=0)[offset::step]
+
+    centroids, _ = _kmeans(norm_array, nested, initial_centroids, 1e-5)
+    indexes, distances = _compute_clusters(norm_array, centroids)
+
+    return {
+        'centroids': _to_list(centroids * std, nested),
+        'indexes': indexes.tolist(),
+        'distances': np.sqrt(distances).tolist(),
+        'outliers': outliers,
+    }
+
+
+def minibatch_kmeans(points, k, batch_size=1000, assign=True):
+    if k < 1:
+        raise ValueError("k must be >= 1.")
+
+    if assign and not is_reiterable(points):
+        raise ValueError("points must be re-iterable to be assigned.")
+
+    centroids = None
+    nested = False
+
+    for batch in iter_batches(points, batch_size):
+        array, nested = _as_array(batch)
+
+        if centroids is None:
+            sample = random.sample(xrange(len(array)), min(k, len(array)))
+            centroids = array[sample].copy()
+            counts = np.zeros(len(centroids), dtype=int)
+
+        n, d = centroids.shape
+        clusters, _ = _compute_clusters(array, centroids)
+        sizes = np.bincount(clusters, minlength=n)
+
+        sums = np.empty((n, d))
+
+        for j in range(d):
+            sums[:, j] = np.bincount(clusters, weights=array[:, j],
+                                     minlength=n)
+
+        # Move each centroid to the running mean of its points.
+        counts += sizes
+        updated = sizes > 0
+        centroids[updated] += (sums[updated] - centroids[updated] *
+                               sizes[updated, np.newaxis]) / \
+            counts[updated, np.newaxis]
+
+    if centroids is None:
+        raise ValueError("points must contain at least 1 point.")
+
+    # Remove centroids of empty clusters.
+    centroids = centroids[counts > 0]
+    counts = counts[counts > 0]
+
+    indexes = distances = None
+
+    if assign:
+        indexes = []
+        distances = []
+        counts = np.zeros(len(centroids), dtype=int)
+
+        for batch in iter_batches(points, batch_size):
+            array, _ = _as_array(batch)
+            clusters, squared = _compute_clusters(array, centroids)
+
+            indexes.extend(clusters.tolist())
+            distances.extend(np.sqrt(squared).tolist())
+            counts += np.bincount(clusters, minlength=len(centroids))
+
+    return {
+        'centroids': _to_list(centroids, nested),
+        'counts': counts.tolist(),
+        'indexes': indexes,
+        'distances': distances,
+    }
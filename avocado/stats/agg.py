@@ -6,6 +6,18 @@ from django.db.models.constants import LOOKUP_SEP
 from modeltree.utils import M
 
 
+# Aggregations by name that can be computed together with `stats`.
+AGGREGATES = {
+    'count': Count,
+    'sum': Sum,
+    'avg': Avg,
+    'min': Min,
+    'max': Max,
+    'stddev': StdDev,
+    'variance': Variance,
+}
+
+
 class Aggregator(object):
     def __init__(self, field, queryset=None, model=None):
         if not isinstance(field, models.Field):
@@ -57,11 +69,17 @@ class Aggregator(object):
         self.__dict__.update(state)
 
     def __len__(self):
-        # If the result cache is filled, use the length otherwise
-        # performa databse hit
+        # If the result cache is filled, use the length otherwise count
+        # the rows (or groups) in the database.
         if hasattr(self, '_length'):
             return self._length
-        return len(self._construct())
+
+        queryset = self._construct()
+
+        if isinstance(queryset, QuerySet):
+            return queryset.count()
+
+        return len(queryset)
 
     def __repr__(self):
         data = list(self[:REPR_OUTPUT_SIZE + 1])
@@ -70,28 +88,50 @@ class Aggregator(object):
         return repr(data)
 
     def __getitem__(self, key):
-        return list(self._result_iter())[key]
+        if hasattr(self, '_result_cache'):
+            return self._result_cache[key]
+
+        queryset = self._construct()
+
+        # The query does not support negative indexes or steps, so
+        # the results are evaluated in full for those.
+        if isinstance(key, slice):
+            lazy = ((key.start is None or key.start >= 0) and
+                    (key.stop is None or key.stop >= 0) and
+                    key.step is None)
+        else:
+            lazy = key >= 0
+
+        if not isinstance(queryset, QuerySet) or not lazy:
+            return list(self._result_iter())[key]
+
+        # Pushes the LIMIT/OFFSET into the query.
+        if isinstance(key, slice):
+            return [self._process(obj) for obj in queryset[key]]
+
+        return self._process(queryset[key])
 
     def __iter__(self):
         return self._result_iter()
 
+    def _process(self, obj):
+        if self._groupby:
+            keys = []
+            for key in self._groupby:
+                keys.append(obj[key])
+                del obj[key]
+            obj['values'] = keys
+        return obj
+
     def _result_iter(self):
         if hasattr(self, '_result_cache'):
             for obj in self._result_cache:
                 yield obj
         else:
-            queryset = self._construct()
             cache = []
             length = 0
 
-            for obj in iter(queryset):
-                if self._groupby:
-                    keys = []
-                    for key in self._groupby:
-                        keys.append(obj[key])
-                        del obj[key]
-                    obj['values'] = keys
-
+            for obj in self.iterator():
                 length += 1
                 cache.append(obj)
                 yield obj
@@ -99,6 +139,18 @@ class Aggregator(object):
             self._result_cache = cache
             self._length = length
 
+    def iterator(self):
+        """Iterates over the results without caching them. Grouped results
+        are streamed from the database.
+        """
+        queryset = self._construct()
+
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.iterator()
+
+        for obj in queryset:
+            yield self._process(obj)
+
     def _construct(self):
         if self._queryset is None:
             queryset = self.model.objects.all()
@@ -287,3 +339,21 @@ class Aggregator(object):
         key = 'variance'
         aggregates = {key: Variance(self.field_name)}
         return self._aggregate_value(key, *groupby, **aggregates)
+
+    def stats(self, *names):
+        """Performs the named aggregations in a single query and returns a
+        dict of the results. In addition to the names in `AGGREGATES`,
+        `rows` is the number of rows including nulls.
+        """
+        aggregates = {}
+
+        for name in names:
+            if name == 'rows':
+                aggregates[name] = Count('*')
+            else:
+                aggregates[name] = AGGREGATES[name](self.field_name)
+
+        agg = self._aggregate(**aggregates)
+
+        for a in agg:
+            return dict((name, a.get(name)) for name in names)
@@ -0,0 +1,188 @@
+from django.db import connections
+from django.db.models.sql.datastructures import EmptyResultSet
+
+# Maximum number of values sampled to estimate quantiles on databases that
+# do not support `percentile_cont`.
+QUANTILE_SAMPLE_SIZE = 10000
+
+
+def _values_sql(queryset, field_name):
+    """Returns the SQL, params and quoted column name of the non-null values
+    of the field in the queryset.
+    """
+    queryset = queryset.filter(**{'{0}__isnull'.format(field_name): False})\
+        .values_list(field_name).order_by()
+
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    field = queryset.model._meta.get_field(field_name)
+    conn = connections[queryset.db]
+
+    return sql, params, conn.ops.quote_name(field.column)
+
+
+def _fetch(queryset, sql, params):
+    cursor = connections[queryset.db].cursor()
+
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _bucket_counts(queryset, expression, expression_params, field_name,
+                   bins):
+    """Counts the values by the bucket `expression` evaluates to. The values
+    are available as `sub.<column>` in the expression. Buckets outside of
+    [0, bins) are clamped.
+    """
+    sql, params, column = _values_sql(queryset, field_name)
+    expression = expression.format(column='sub.' + column)
+
+    rows = _fetch(queryset, 'SELECT {0}, COUNT(*) FROM ({1}) sub GROUP BY 1'
+                  .format(expression, sql),
+                  tuple(expression_params) + tuple(params))
+
+    counts = [0] * bins
+
+    for bucket, count in rows:
+        bucket = min(max(int(bucket), 0), bins - 1)
+        counts[bucket] += count
+
+    return counts
+
+
+def _width_expression(vendor, minimum, maximum, bins):
+    "Returns the expression and params for the zero-based bucket of a value."
+    if vendor == 'postgresql':
+        # Values equal to the maximum fall in bucket `bins + 1`, these are
+        # clamped to the last bucket.
+        return 'width_bucket({column}, %s, %s, %s) - 1', \
+            [minimum, maximum, bins]
+
+    width = (maximum - minimum) / float(bins)
+
+    # Values are never less than the minimum so truncating is the same as
+    # the floor.
+    if vendor == 'sqlite':
+        return 'CAST(({column} - %s) / %s AS INTEGER)', [minimum, width]
+
+    return 'FLOOR(({column} - %s) / %s)', [minimum, width]
+
+
+def _interpolate(values, fraction):
+    "Linear interpolation between the closest ranks like `percentile_cont`."
+    position = fraction * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+
+    return values[lower] + (values[upper] - values[lower]) * \
+        (position - lower)
+
+
+def _quantile_edges(queryset, field_name, bins):
+    fractions = [i / float(bins) for i in range(bins + 1)]
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        sql, params, column = _values_sql(queryset, field_name)
+
+        rows = _fetch(queryset, 'SELECT percentile_cont(%s) WITHIN GROUP '
+                      '(ORDER BY sub.{0}) FROM ({1}) sub'.format(column, sql),
+                      (fractions,) + tuple(params))
+
+        edges = rows[0][0]
+
+        if edges is None:
+            return []
+
+        return [float(e) for e in edges]
+
+    # Estimate the quantiles from a random sample of the values.
+    values = queryset\
+        .filter(**{'{0}__isnull'.format(field_name): False})\
+        .values_list(field_name, flat=True)\
+        .order_by('?')[:QUANTILE_SAMPLE_SIZE]
+
+    values = sorted(float(v) for v in values)
+
+    if not values:
+        return []
+
+    edges = [_interpolate(values, f) for f in fractions]
+
+    return edges
+
+
+def histogram(queryset, field_name, bins=10, quantiles=False):
+    """Bins the non-null values of the field in the queryset and returns a
+    dict with the `edges` of the bins and the `counts` of values in each bin.
+
+    There is one more edge than bins. Bins include the lower edge and exclude
+    the upper edge except the last one which includes both.
+
+    By default the bins are of equal width. If `quantiles` is true, the edges
+    are the quantiles of the values, so bins are of (roughly) equal counts.
+    Quantiles are exact on PostgreSQL and estimated from a sample of values
+    on other databases.
+    """
+    if bins < 1:
+        raise ValueError('at least one bin is required')
+
+    try:
+        return _histogram(queryset, field_name, bins, quantiles)
+    except EmptyResultSet:
+        return {'edges': [], 'counts': []}
+
+
+def _histogram(queryset, field_name, bins, quantiles):
+    vendor = connections[queryset.db].vendor
+
+    if quantiles:
+        edges = _quantile_edges(queryset, field_name, bins)
+
+        if not edges:
+            return {'edges': [], 'counts': []}
+
+        # A CASE expression that finds the first bin the value is below the
+        # upper edge of. The first and last edges are the minimum and
+        # maximum, so they are not needed.
+        cases = ' '.join(['WHEN {column} < %s THEN ' + str(i)
+                          for i in range(bins - 1)])
+
+        if cases:
+            expression = 'CASE {0} ELSE {1} END'.format(cases, bins - 1)
+        else:
+            expression = '0'
+
+        counts = _bucket_counts(queryset, expression, edges[1:-1],
+                                field_name, bins)
+
+        return {'edges': edges, 'counts': counts}
+
+    sql, params, column = _values_sql(queryset, field_name)
+
+    rows = _fetch(queryset, 'SELECT MIN(sub.{0}), MAX(sub.{0}) FROM ({1}) sub'
+                  .format(column, sql), params)
+
+    minimum, maximum = rows[0]
+
+    if minimum is None:
+        return {'edges': [], 'counts': []}
+
+    minimum, maximum = float(minimum), float(maximum)
+
+    if minimum == maximum:
+        counts = _bucket_counts(queryset, '0', (), field_name, 1)
+        return {'edges': [minimum, maximum], 'counts': counts}
+
+    width = (maximum - minimum) / float(bins)
+    edges = [minimum + width * i for i in range(bins)] + [maximum]
+
+    expression, expression_params = _width_expression(
+        vendor, minimum, maximum, bins)
+
+    counts = _bucket_counts(queryset, expression, expression_params,
+                            field_name, bins)
+
+    return {'edges': edges, 'counts': counts}
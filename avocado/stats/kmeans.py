@@ -1,6 +1,30 @@
 import math
 import random
+from functools import wraps
+from itertools import islice
 from collections import defaultdict
+from avocado.conf import dep_supported
+
+# Use the NumPy implementations of the clustering functions if NumPy is
+# installed. Set to False to always use the pure-Python implementations.
+USE_NUMPY = True
+
+
+def vectorized(func):
+    """Decorator for dispatching to the NumPy implementation of the function
+    if enabled. The pure-Python implementation is available as `func.python`.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if USE_NUMPY and dep_supported('numpy'):
+            from avocado.stats import _kmeans_numpy
+            return getattr(_kmeans_numpy, func.__name__)(*args, **kwargs)
+
+        return func(*args, **kwargs)
+
+    wrapper.python = func
+
+    return wrapper
 
 
 def std_dev(values):
@@ -81,6 +105,7 @@ def divide_lists(lst_numer, lst_denom):
     return [[n[i] / float(lst_denom[i]) for i in indexes] for n in lst_numer]
 
 
+@vectorized
 def normalize(points):
     """
     Normalizes a set of points on a per dimension basis.
@@ -281,6 +306,7 @@ def index_of_min(values):
     return min_index
 
 
+@vectorized
 def compute_clusters(points, centroids):
     """
     Computes cluster assignment and distance to cluster centroid for 'points'.
@@ -373,6 +399,7 @@ def dimension_mean(points):
     return [sum(d) / float(len(d)) for d in dimensions]
 
 
+@vectorized
 def kmeans(points, k_or_centroids, threshold=1e-5):
     """
     Runs the k-means algorithm on the points for k clusters.
@@ -457,6 +484,7 @@ def kmeans(points, k_or_centroids, threshold=1e-5):
     return centroids, previous_mean_distance
 
 
+@vectorized
 def find_outliers(points, outlier_threshold=3, normalized=True):
     """
     Finds and returns outliers in the 'points'.
@@ -512,6 +540,7 @@ def find_outliers(points, outlier_threshold=3, normalized=True):
                 (distance / mean_distance) >= outlier_threshold)]
 
 
+@vectorized
 def kmeans_optm(points, k=None, outlier_threshold=3):
     """
     Execute k-means clustering(for finding centroid) on, compute the clusters
@@ -627,6 +656,161 @@ def kmeans_optm(points, k=None, outlier_threshold=3):
     }
 
 
+def iter_points(points):
+    """Returns a new iterator over the points for a pass over them.
+
+    'points' may be a zero-argument callable that returns a new iterator
+    for each pass. QuerySets are read using iterator() so the rows are not
+    cached on the QuerySet.
+    """
+    if callable(points):
+        return iter(points())
+
+    if hasattr(points, 'iterator'):
+        return points.iterator()
+
+    return iter(points)
+
+
+def is_reiterable(points):
+    """Returns true if the points can be read more than once. Calling iter()
+    on a QuerySet would fetch its rows, so it is checked for first.
+    """
+    if callable(points) or hasattr(points, 'iterator'):
+        return True
+
+    return iter(points) is not points
+
+
+def iter_batches(points, batch_size):
+    "Yields lists of up to `batch_size` points from the points."
+    iterator = iter_points(points)
+
+    while True:
+        batch = list(islice(iterator, batch_size))
+
+        if not batch:
+            break
+
+        yield batch
+
+
+@vectorized
+def minibatch_kmeans(points, k, batch_size=1000, assign=True):
+    """
+    Runs mini-batch k-means on the points for k clusters.
+
+    Unlike kmeans(), the points are consumed in batches of 'batch_size' so
+    they do not need to fit in memory. This makes it possible to cluster
+    the rows of a table by streaming them from a cursor, for example:
+
+        >>> points = lambda: queryset.values_list('x', 'y').iterator()
+
+    The initial centroids are k random points of the first batch. For each
+    batch, the points are assigned to the closest centroid and each centroid
+    is moved to the mean of all the points assigned to it so far. Centroids
+    that are never assigned a point are removed.
+
+    See:
+        http://www.eecs.tufts.edu/~dsculley/papers/fastkmeans.pdf
+
+    Arguments:
+        points: iterable of points of any dimension or a zero-argument
+            callable returning a new iterator of points
+        k: int
+            The number of clusters.
+        batch_size: int
+            The number of points to read and cluster at a time.
+        assign: bool
+            If true, the points are read a second time to assign each point
+            to a cluster of the final centroids. This requires 'points' to
+            be re-iterable such as a list, a QuerySet or a callable rather
+            than an iterator. A QuerySet is read using iterator() for each
+            pass so its rows are not cached in memory.
+
+    Returns:
+        A dictionary containing the following data:
+        'centroids': The centroids of the clusters.
+        'counts':    The number of points in each cluster.
+        'indexes':   An ordered list mapping each point to the centroid of
+                     the cluster it falls in. This is None if 'assign' is
+                     false.
+        'distances': A list of distances between each point and the
+                     centroid of its cluster. This is None if 'assign' is
+                     false.
+    """
+    if k < 1:
+        raise ValueError("k must be >= 1.")
+
+    if assign and not is_reiterable(points):
+        raise ValueError("points must be re-iterable to be assigned.")
+
+    centroids = None
+    nested = False
+    counts = []
+
+    for batch in iter_batches(points, batch_size):
+        if centroids is None:
+            nested = is_nested(batch)
+            centroids = random.sample(batch, min(k, len(batch)))
+
+            if nested:
+                centroids = [[float(x) for x in c] for c in centroids]
+
+            counts = [0] * len(centroids)
+
+        indexes, _ = compute_clusters(batch, centroids)
+        members = defaultdict(list)
+
+        for i, p in zip(indexes, batch):
+            members[i].append(p)
+
+        # Move each centroid to the running mean of its points.
+        for i, ps in members.items():
+            total = counts[i] + len(ps)
+            mean = dimension_mean(ps)
+
+            if nested:
+                centroids[i] = [
+                    c + (m - c) * len(ps) / float(total)
+                    for c, m in zip(centroids[i], mean)
+                ]
+            else:
+                centroids[i] += (mean - centroids[i]) * len(ps) / float(total)
+
+            counts[i] = total
+
+    if centroids is None:
+        raise ValueError("points must contain at least 1 point.")
+
+    # Remove centroids of empty clusters.
+    centroids = [c for i, c in enumerate(centroids) if counts[i]]
+    counts = [n for n in counts if n]
+
+    indexes = distances = None
+
+    if assign:
+        indexes = []
+        distances = []
+        counts = [0] * len(centroids)
+
+        for batch in iter_batches(points, batch_size):
+            batch_indexes, batch_distances = compute_clusters(batch,
+                                                              centroids)
+            indexes.extend(batch_indexes)
+            distances.extend(batch_distances)
+
+            for i in batch_indexes:
+                counts[i] += 1
+
+    return {
+        'centroids': centroids,
+        'counts': counts,
+        'indexes': indexes,
+        'distances': distances,
+    }
+
+
 def weighted_counts(points, counts, k):
     """
     Calculate and return the weighted count of each centroid.
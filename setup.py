@@ -35,6 +35,12 @@ kwargs = {
         'extras': ['openpyxl>=1.7,<2.2'],
         # Pretty printing of SQL in the admin and for debugging
         'sql': ['sqlparse'],
+        # Vectorized statistics
+        'stats': ['numpy'],
+        # Parquet exporter
+        'parquet': ['pyarrow'],
+        # Zstandard compression of exports
+        'zstd': ['zstandard'],
     },
 
     # Metadata
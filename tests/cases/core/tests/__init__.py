@@ -2,3 +2,4 @@ from .backup import *       # noqa
 from .cache import *        # noqa
 from .utils import *        # noqa
 from .registry import *     # noqa
+from .structures import *   # noqa
@@ -1,6 +1,12 @@
+import os
+import sys
 import time
+import unittest
+import hashlib
 import cPickle as pickle
+from django.core.cache import get_cache
 from django.db import models
+from django.db.models.query import QuerySet
 from django.test import TestCase
 from django.test.utils import override_settings
 from avocado.core.cache import CacheProxy, instance_cache_key
@@ -77,6 +83,193 @@ class CacheProxyTestCase(TestCase):
         self.assertIsNone(self.cp.get(c, args, kwargs))
         self.assertFalse(self.cp.cached(c, args, kwargs))
 
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True,
+                       AVOCADO_DATA_CACHE_L1_SIZE=10)
+    def test_local(self):
+        c = ComplexNumber()
+        key = self.cp.cache_key(c)
+        self.cp.flush(c)
+
+        self.assertEqual(self.cp.get_or_set(c), '2+3i')
+        self.assertEqual(self.cp.stats, {'hits': 0, 'misses': 1})
+
+        # Served from the local cache without the backend.
+        get_cache('default').delete(key)
+        self.assertEqual(self.cp.get(c), '2+3i')
+        self.assertEqual(self.cp.stats, {'hits': 1, 'misses': 1})
+
+        # Flushing removes it from both.
+        self.cp.flush(c)
+        self.assertIsNone(self.cp.get(c))
+        self.assertEqual(self.cp.stats, {'hits': 1, 'misses': 2})
+
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True,
+                       AVOCADO_DATA_CACHE_L1_SIZE=10,
+                       AVOCADO_DATA_CACHE_L1_TIMEOUT=1)
+    def test_local_timeout(self):
+        c = ComplexNumber()
+        key = self.cp.cache_key(c)
+        self.cp.flush(c)
+
+        self.cp.get_or_set(c)
+        get_cache('default').delete(key)
+
+        time.sleep(1.1)
+
+        # Expired locally and gone from the backend.
+        self.assertIsNone(self.cp.get(c))
+
+
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.cp = CacheProxy(ComplexNumber.as_string,
+                             version='get_version',
+                             timeout=10,
+                             key_func=instance_cache_key,
+                             single_flight=True,
+                             stale_timeout=10)
+        self.cp.wait_timeout = 0.5
+        self.cp.wait_interval = 0.05
+
+        self.c = ComplexNumber()
+        self.key = self.cp.cache_key(self.c)
+        self.lock_key = self.key + ':lock'
+        self.cache = get_cache('default')
+
+        self.cp.flush(self.c)
+        self.cache.delete(self.lock_key)
+        self.cache.delete(self.cp.stale_key(self.c))
+
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test(self):
+        self.assertEqual(self.cp.get_or_set(self.c), '2+3i')
+
+        # The lock is released and the stale copy is set.
+        self.assertFalse(self.lock_key in self.cache)
+        self.assertEqual(self.cache.get(self.cp.stale_key(self.c)), '2+3i')
+
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_stale(self):
+        self.cache.set(self.cp.stale_key(self.c), '1+1i')
+        self.cache.add(self.lock_key, 1)
+
+        # Another process holds the lock, so the stale copy is used.
+        self.assertEqual(self.cp.get_or_set(self.c), '1+1i')
+        self.assertFalse(self.cp.cached(self.c))
+
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_wait(self):
+        self.cache.add(self.lock_key, 1)
+
+        # No stale copy, so the data is computed after waiting.
+        start = time.time()
+        self.assertEqual(self.cp.get_or_set(self.c), '2+3i')
+        self.assertTrue(time.time() - start >= 0.5)
+
+
+class CacheKeyTestCase(TestCase):
+    def setUp(self):
+        self.foo = Foo(value=1)
+        self.foo.save()
+
+    def test_arguments(self):
+        f = self.foo
+
+        self.assertEqual(instance_cache_key(f, 'label'),
+                         instance_cache_key(f, 'label', kwargs={'q': None}))
+        self.assertEqual(instance_cache_key(f, 'label', args=[1]),
+                         instance_cache_key(f, 'label', args=(1,)))
+        self.assertEqual(
+            instance_cache_key(f, 'label', kwargs={'a': 1, 'b': [2]}),
+            instance_cache_key(f, 'label', kwargs={'b': [2], 'a': 1}))
+
+        keys = set([
+            instance_cache_key(f, 'label'),
+            instance_cache_key(f, 'label', version=2),
+            instance_cache_key(f, 'other'),
+            instance_cache_key(f, 'label', args=[1]),
+            instance_cache_key(f, 'label', args=[1.0]),
+            instance_cache_key(f, 'label', args=['1']),
+            instance_cache_key(f, 'label', args=[True]),
+            instance_cache_key(f, 'label', kwargs={'a': 1}),
+            instance_cache_key(f, 'label',
+                               kwargs={'q': Foo.objects.all()}),
+            instance_cache_key(f, 'label',
+                               kwargs={'q': Foo.objects.filter(value=1)}),
+        ])
+
+        self.assertEqual(len(keys), 10)
+
+    def test_queryset(self):
+        queryset = Foo.objects.all()
+
+        key = instance_cache_key(self.foo, 'label',
+                                 kwargs={'q': queryset})
+
+        # The compiled SQL is memoized on the queryset.
+        self.assertTrue(hasattr(queryset, '_cache_key_sql'))
+        self.assertEqual(key, instance_cache_key(self.foo, 'label',
+                                                 kwargs={'q': queryset}))
+
+        # A new queryset with the same SQL has the same key.
+        queryset = Foo.objects.all()
+        self.assertEqual(key, instance_cache_key(self.foo, 'label',
+                                                 kwargs={'q': queryset}))
+
+
+@unittest.skipUnless(os.environ.get('AVOCADO_BENCHMARK'),
+                     'Set AVOCADO_BENCHMARK=1 to run benchmarks')
+class CacheKeyBenchmarkTestCase(TestCase):
+    def setUp(self):
+        self.foo = Foo(value=1)
+        self.foo.save()
+
+    def test(self):
+        # Reference implementation of the previous key derivation which
+        # pickled the arguments and hashed the instance metadata separately.
+        def sha(l):
+            return hashlib.sha256(':'.join([str(x) for x in l])).hexdigest()
+
+        def reference(instance, label, version, kwargs):
+            opts = instance._meta
+            label = sha([opts.app_label, opts.model_name, instance.pk, label])
+            key = [label, version]
+
+            _kwargs = {}
+            for k, v in kwargs.items():
+                if v is not None:
+                    if isinstance(v, QuerySet):
+                        sql, params = v.query.get_compiler(v.db).as_sql()
+                        v = sql % params
+                    _kwargs[k] = v
+
+            if _kwargs:
+                key.append(pickle.dumps((None, _kwargs)))
+
+            return sha(key)
+
+        def timeit(func, n=2000):
+            start = time.time()
+            for _ in xrange(n):
+                func()
+            return (time.time() - start) / n * 1e6
+
+        f = self.foo
+        queryset = Foo.objects.filter(value=1)
+
+        cases = [
+            ('no arguments', {}),
+            ('queryset', {'queryset': queryset}),
+        ]
+
+        for name, kwargs in cases:
+            before = timeit(lambda: reference(f, 'label', 1, kwargs))
+            after = timeit(lambda: instance_cache_key(f, 'label', 1,
+                                                      kwargs=kwargs))
+
+            sys.stderr.write('\ncache key ({0}): {1:.1f}us -> {2:.1f}us '
+                             'per call '.format(name, before, after))
+
 
 class CacheManagerTestCase(TestCase):
     @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
@@ -0,0 +1,35 @@
+from django.test import TestCase
+from avocado.core.structures import LRUCache
+
+
+class LRUCacheTestCase(TestCase):
+    def test_get_set(self):
+        cache = LRUCache()
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 1), 1)
+
+        cache.set('a', 2)
+        self.assertEqual(cache.get('a'), 2)
+        self.assertTrue('a' in cache)
+
+        cache.delete('a')
+        self.assertFalse('a' in cache)
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        # Access marks 'a' as the most recently used.
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertTrue('c' in cache)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
@@ -1,13 +1,34 @@
 import os
+import sys
+import csv
+import json
+import time
+import unittest
+from gzip import GzipFile
+from zipfile import ZipFile, LargeZipFile, ZIP_DEFLATED, ZIP64_LIMIT
+from cStringIO import StringIO
 from django.test import TestCase
 from django.http import HttpResponse
 from django.template import Template
 from django.core import management
 from avocado import export
+from avocado.conf import dep_supported
+from avocado.export._csv import UnicodeWriter
+from avocado.export._zip import ZipMemberWriter
 from avocado.models import DataField, DataConcept, DataConceptField, DataView
 from avocado.query.pipeline import QueryProcessor
 from ... import models
 
+if dep_supported('openpyxl'):
+    from openpyxl import load_workbook
+
+if dep_supported('zstandard'):
+    import zstandard
+
+if dep_supported('pyarrow'):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
 
 html_table = """
 <table>
@@ -65,16 +86,80 @@ class ExportTestCase(TestCase):
         rows = list(it)
         self.assertEqual([r[0] for r in rows], self.pks)
 
+    def test_cached_read_bounded(self):
+        self.exporter.cache_size = 2
+
+        it = self.exporter.cached_read(self.iterable)
+        rows = list(it)
+        self.assertEqual([r[0] for r in rows], self.pks)
+        self.assertEqual(len(self.exporter._format_cache), 2)
+
+    def test_cached_read_bypass(self):
+        self.exporter.cache_warmup = 3
+        self.exporter.cache_min_hit_ratio = 0.5
+
+        it = self.exporter.cached_read(self.iterable)
+        rows = list(it)
+        self.assertEqual([r[0] for r in rows], self.pks)
+
+        # Primary keys are unique so the cache never hits and is bypassed
+        # once the warm-up lookups have been made.
+        pk_formatter = self.exporter.params[0][0]
+        stats = self.exporter.format_cache_stats[pk_formatter]
+
+        self.assertTrue(stats['bypassed'])
+        self.assertEqual(stats['hits'], 0)
+        self.assertEqual(stats['misses'], 3)
+
     def test_threaded_read(self):
         it = self.exporter.threaded_read(self.iterable)
         rows = list(it)
         self.assertEqual([r[0] for r in rows], self.pks)
 
+    def test_threaded_read_chunks(self):
+        it = self.exporter.threaded_read(self.iterable, threads=2,
+                                         chunk_size=1)
+        rows = list(it)
+        self.assertEqual([r[0] for r in rows], self.pks)
+
+    def test_threaded_read_close(self):
+        it = self.exporter.threaded_read(self.iterable, chunk_size=2)
+        self.assertEqual(next(it)[0], self.pks[0])
+
+        # Stopping early shuts down the pool.
+        it.close()
+        self.assertRaises(StopIteration, next, it)
+
     def test_cached_threaded_read(self):
         it = self.exporter.cached_threaded_read(self.iterable)
         rows = list(it)
         self.assertEqual([r[0] for r in rows], self.pks)
 
+    def test_cached_threaded_read_stats(self):
+        it = self.exporter.cached_threaded_read(self.iterable, threads=4,
+                                                chunk_size=1)
+        rows = list(it)
+
+        # Every lookup is counted once across the worker threads.
+        for stats in self.exporter.format_cache_stats.values():
+            self.assertEqual(stats['hits'] + stats['misses'], len(rows))
+
+    def test_parallel_read(self):
+        it = self.exporter.parallel_read(self.iterable, processes=2,
+                                         chunk_size=2)
+        rows = list(it)
+        self.assertEqual([r[0] for r in rows], self.pks)
+
+    def test_columnar_read(self):
+        it = self.exporter.columnar_read(self.iterable, chunk_size=4)
+        rows = list(it)
+        self.assertEqual([r[0] for r in rows], self.pks)
+
+    def test_columnar_reader(self):
+        reader = self.exporter.reader('columnar')
+        rows = list(reader(self.iterable))
+        self.assertEqual([r[0] for r in rows], self.pks)
+
     def test_manual_read(self):
         it = self.exporter.manual_read(self.iterable)
         rows = list(it)
@@ -183,7 +268,7 @@ class FileExportTestCase(TestCase):
 
     def test_sas(self):
         name = 'sas_export.zip'
-        exp_size = 1340
+        exp_size = 1240
 
         exporter = export.SASExporter(self.concepts)
         it = exporter.read(self.query)
@@ -221,6 +306,35 @@ class FileExportTestCase(TestCase):
 
         os.remove(name)
 
+    def test_json_modes(self):
+        exporter = export.JSONExporter(self.concepts)
+        keys = [f['name'] for f in exporter.header]
+
+        data = json.loads(exporter.write(exporter.read(self.query))
+                          .getvalue())
+
+        exporter = export.JSONExporter(self.concepts, mode='compact')
+        compact = json.loads(exporter.write(exporter.read(self.query))
+                             .getvalue())
+
+        self.assertEqual(compact[0], keys)
+        self.assertEqual([dict(zip(keys, r)) for r in compact[1:]], data)
+
+        exporter = export.JSONExporter(self.concepts, mode='ndjson')
+        self.assertEqual(exporter.file_extension, 'ndjson')
+
+        lines = exporter.write(exporter.read(self.query)).getvalue()\
+            .splitlines()
+        self.assertEqual([json.loads(l) for l in lines], data)
+
+        # The output is streamed a row at a time.
+        chunks = list(export.JSONExporter(self.concepts).iterencode(
+            exporter.read(self.query)))
+        self.assertEqual(len(chunks), len(data) + 2)
+
+        self.assertRaises(ValueError, export.JSONExporter, self.concepts,
+                          mode='xml')
+
     def test_html(self):
         name = 'export.html'
         exp_size = 892
@@ -236,6 +350,72 @@ class FileExportTestCase(TestCase):
 
         os.remove(name)
 
+    @unittest.skipUnless(dep_supported('pyarrow'), 'pyarrow is not installed')
+    def test_parquet(self):
+        name = 'export.parquet'
+
+        # Coded by the title id to test the dictionary encoding.
+        title_field = DataField.objects.get_by_natural_key(
+            'tests', 'title', 'name')
+        title_field.code_field_name = 'id'
+        title_field.save()
+
+        exporter = export.ParquetExporter(self.concepts)
+        exporter.batch_size = 2
+
+        it = exporter.read(self.query)
+        exporter.write(it, buff=name)
+
+        parquet_file = pq.ParquetFile(name)
+        table = parquet_file.read()
+
+        # A row group per batch.
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+
+        schema = table.schema
+        self.assertEqual(schema.names, ['first_name', 'last_name',
+                                        'is_manager', 'name', 'salary'])
+        self.assertEqual(schema.field_by_name('first_name').type,
+                         pa.string())
+        self.assertEqual(schema.field_by_name('is_manager').type,
+                         pa.bool_())
+        self.assertEqual(schema.field_by_name('salary').type, pa.int64())
+        self.assertTrue(pa.types.is_dictionary(
+            schema.field_by_name('name').type))
+        self.assertEqual(
+            schema.field_by_name('salary').metadata['description'], 'Salary')
+
+        rows = zip(*[table.column(n).to_pylist() for n in schema.names])
+        self.assertEqual(rows, [tuple(r) for r in self.query])
+
+        os.remove(name)
+
+    @unittest.skipUnless(dep_supported('pyarrow'), 'pyarrow is not installed')
+    def test_parquet_unknown_values(self):
+        title_field = DataField.objects.get_by_natural_key(
+            'tests', 'title', 'name')
+        title_field.code_field_name = 'id'
+        title_field.save()
+
+        exporter = export.ParquetExporter(self.concepts)
+
+        rows = list(exporter.read(self.query))
+        rows[-1] = rows[-1][:3] + (u'Unknown',) + rows[-1][4:]
+
+        # The coded column falls back to strings rather than writing nulls
+        # for the values that cannot be encoded.
+        buff = exporter.write(rows)
+        table = pq.read_table(pa.BufferReader(buff.getvalue()))
+
+        self.assertEqual(table.schema.field_by_name('name').type,
+                         pa.string())
+        self.assertEqual(table.column('name').to_pylist()[-1], u'Unknown')
+
+        # The types are fixed by the first batch, so a later batch raises.
+        exporter.batch_size = 2
+        self.assertRaises(ValueError, exporter.write, rows)
+
 
 class ResponseExportTestCase(FileExportTestCase):
     def test_csv(self):
@@ -249,6 +429,64 @@ class ResponseExportTestCase(FileExportTestCase):
 
         self.assertAlmostEqual(len(response.content), exp_size, delta=delta)
 
+    def test_csv_gzip(self):
+        response = HttpResponse()
+        exporter = export.CSVExporter(self.concepts, compression='gzip')
+
+        it = exporter.read(self.query)
+        exporter.write(it, buff=response)
+
+        content = GzipFile(fileobj=StringIO(response.content)).read()
+        self.assertAlmostEqual(len(content), 240, delta=delta)
+
+    def test_compression(self):
+        data = export.JSONExporter(self.concepts).write(
+            export.JSONExporter(self.concepts).read(self.query)).getvalue()
+
+        exporter = export.JSONExporter(self.concepts, compression='gzip',
+                                       compression_level=1)
+        self.assertEqual(exporter.file_extension, 'json.gz')
+        self.assertEqual(exporter.content_type, 'application/gzip')
+
+        response = HttpResponse()
+        exporter.write(exporter.read(self.query), buff=response)
+
+        content = GzipFile(fileobj=StringIO(response.content)).read()
+        self.assertEqual(content, data)
+
+        # Removing the compression restores the extension and type.
+        exporter.set_compression(None)
+        self.assertEqual(exporter.file_extension, 'json')
+        self.assertEqual(exporter.content_type, 'application/json')
+
+        exporter = export.CSVExporter(self.concepts)
+        self.assertRaises(ValueError, exporter.set_compression, 'bz2')
+
+        # The bundles are already compressed.
+        self.assertRaises(ValueError, export.SASExporter, self.concepts,
+                          compression='gzip')
+
+    @unittest.skipUnless(dep_supported('zstandard'),
+                         'zstandard is not installed')
+    def test_csv_zstd(self):
+        data = export.CSVExporter(self.concepts).write(
+            export.CSVExporter(self.concepts).read(self.query)).getvalue()
+
+        response = HttpResponse()
+        exporter = export.CSVExporter(self.concepts)
+
+        exporter.set_compression('zstd')
+        self.assertEqual(exporter.file_extension, 'csv.zst')
+        self.assertEqual(exporter.content_type, 'application/zstd')
+
+        it = exporter.read(self.query)
+        exporter.write(it, buff=response)
+
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            StringIO(response.content))
+        content = reader.read(10000)
+        self.assertEqual(content, data)
+
     def test_excel(self):
         exp_size = 6086
 
@@ -260,8 +498,37 @@ class ResponseExportTestCase(FileExportTestCase):
 
         self.assertAlmostEqual(len(response.content), exp_size, delta=delta)
 
+    def test_excel_sheets(self):
+        response = HttpResponse()
+        exporter = export.ExcelExporter(self.concepts)
+
+        # The header and two rows per sheet.
+        exporter.max_rows = 3
+
+        it = exporter.read(self.query)
+        exporter.write(it, buff=response)
+
+        wb = load_workbook(StringIO(response.content))
+        self.assertEqual(wb.get_sheet_names(), [
+            'Data', 'Data (2)', 'Data (3)', 'Data Dictionary'])
+
+        rows = []
+
+        for title in wb.get_sheet_names()[:3]:
+            ws = wb.get_sheet_by_name(title)
+            values = [[c.value for c in r] for r in ws.rows]
+
+            self.assertEqual(len(values), 3)
+            self.assertEqual(values[0][0], 'First Name')
+            rows.extend(values[1:])
+
+        self.assertEqual(len(rows), 6)
+
+        ws_dict = wb.get_sheet_by_name('Data Dictionary')
+        self.assertEqual(len(ws_dict.rows), len(exporter.header) + 1)
+
     def test_sas(self):
-        exp_size = 1340
+        exp_size = 1240
 
         response = HttpResponse()
         exporter = export.SASExporter(self.concepts)
@@ -282,6 +549,37 @@ class ResponseExportTestCase(FileExportTestCase):
 
         self.assertAlmostEqual(len(response.content), exp_size, delta=delta)
 
+    def test_bundle_members(self):
+        csv_exporter = export.CSVExporter(self.concepts)
+        data = csv_exporter.write(csv_exporter.read(self.query)).getvalue()
+
+        for exporter_class, script in ((export.SASExporter, 'script.sas'),
+                                       (export.RExporter, 'script.R')):
+            response = HttpResponse()
+            exporter = exporter_class(self.concepts)
+
+            it = exporter.read(self.query)
+            exporter.write(it, buff=response)
+
+            zip_file = ZipFile(StringIO(response.content))
+
+            self.assertEqual(zip_file.testzip(), None)
+            self.assertEqual(zip_file.namelist(), ['data.csv', script])
+            self.assertEqual(zip_file.getinfo('data.csv').compress_type,
+                             ZIP_DEFLATED)
+
+            # The coded formats may differ, but not the shape.
+            lines = zip_file.read('data.csv').splitlines()
+            self.assertEqual(len(lines), len(data.splitlines()))
+
+    def test_bundle_member_limit(self):
+        zip_file = ZipFile(StringIO(), 'w')
+        writer = ZipMemberWriter(zip_file, 'data.csv')
+
+        # Members cannot exceed the 4 GB limit without ZIP64 extensions.
+        writer.zinfo.file_size = ZIP64_LIMIT
+        self.assertRaises(LargeZipFile, writer.write, 'a')
+
     def test_json(self):
         exp_size = 630
 
@@ -305,6 +603,52 @@ class ResponseExportTestCase(FileExportTestCase):
 
         self.assertAlmostEqual(len(response.content), exp_size, delta=delta)
 
+    @unittest.skipUnless(dep_supported('pyarrow'), 'pyarrow is not installed')
+    def test_parquet(self):
+        response = HttpResponse()
+        exporter = export.ParquetExporter(self.concepts)
+
+        it = exporter.read(self.query)
+        exporter.write(it, buff=response)
+
+        table = pq.read_table(pa.BufferReader(response.content))
+        self.assertEqual(table.num_rows, 6)
+
+
+class DirUnicodeWriter(UnicodeWriter):
+    "The writer prior to the per-cell `dir()` check being removed."
+    def writerow(self, row):
+        self.writer.writerow([
+            s.encode("utf-8")
+            if 'encode' in dir(s) else s
+            for s in row
+        ])
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+
+@unittest.skipUnless(os.environ.get('AVOCADO_BENCHMARK'),
+                     'Set AVOCADO_BENCHMARK=1 to run benchmarks')
+class CSVWriterBenchmarkTestCase(TestCase):
+    def timeit(self, writer_class, rows):
+        start = time.time()
+        writer = writer_class(StringIO(), quoting=csv.QUOTE_MINIMAL)
+        writer.writerows(rows)
+        return time.time() - start
+
+    def test(self):
+        row = [u'value {0}'.format(i) if i % 2 else i for i in xrange(50)]
+
+        for n in (10000, 100000):
+            rows = [row] * n
+
+            sys.stderr.write('\nCSV ({0} rows x 50 columns): dir {1:.2f}s, '
+                             'isinstance {2:.2f}s '.format(
+                                 n, self.timeit(DirUnicodeWriter, rows),
+                                 self.timeit(UnicodeWriter, rows)))
+
 
 class ForceDistinctRegressionTestCase(TestCase):
     fixtures = ['tests/fixtures/employee_data.json']
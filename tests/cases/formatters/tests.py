@@ -1,7 +1,9 @@
 from django.test import TestCase
 from django.core import management
+from django.test.utils import override_settings
 from avocado.models import DataField, DataConcept, DataConceptField
-from avocado.formatters import Formatter
+from avocado.formatters import Formatter, FormatterMismatchError, \
+    get_coded_values
 
 
 class FormatterTestCase(TestCase):
@@ -75,6 +77,26 @@ class FormatterTestCase(TestCase):
 
         self.assertEqual(fvalues, expected)
 
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_coded_values_snapshot(self):
+        field = DataField.objects.get_by_natural_key('tests', 'title', 'name')
+        field.code_field_name = 'id'
+        field.save()
+
+        coded_values = get_coded_values(field)
+        self.assertEqual(coded_values, dict(iter(field.coded_values())))
+
+        # Shared by subsequent lookups and formatters.
+        self.assertTrue(get_coded_values(field) is coded_values)
+
+        f = Formatter(self.concept, formats=['coded'])
+        f.to_coded('CEO', field, {})
+        self.assertTrue(f._coded_values[field.pk] is coded_values)
+
+        # Rebuilt when the data version changes.
+        field.data_version += 1
+        self.assertFalse(get_coded_values(field) is coded_values)
+
     def test_to_html(self):
         class HtmlFormatter(Formatter):
             def to_html(self, values, fields, context):
@@ -114,3 +136,83 @@ class FormatterTestCase(TestCase):
         names = [x['name'] for x in meta['header']]
 
         self.assertEqual(names, ['title__name', 'project__name'])
+
+    def test_format_batch(self):
+        f = Formatter(self.concept, formats=['string'])
+
+        rows = [self.values, ['CTO', None, False]]
+
+        self.assertEqual(f.format_batch(rows), [
+            ('CEO', '100000', 'True'),
+            ('CTO', '', 'False'),
+        ])
+
+        self.assertEqual(f.format_batch(rows), [f(row) for row in rows])
+
+    def test_format_batch_override(self):
+        class UpperFormatter(Formatter):
+            def __call__(self, values, context=None):
+                values = super(UpperFormatter, self).__call__(values, context)
+                return tuple(unicode(v).upper() for v in values)
+
+        f = UpperFormatter(self.concept)
+
+        self.assertEqual(f.format_batch([self.values]),
+                         [('CEO', '100000', 'TRUE')])
+
+    def test_process_single_override(self):
+        class PrefixFormatter(Formatter):
+            def _process_single(self, method, value, field, context):
+                output = super(PrefixFormatter, self)._process_single(
+                    method, value, field, context)
+                return tuple(u'{0}:{1}'.format(field.field_name, v)
+                             for v in output)
+
+        f = PrefixFormatter(self.concept, formats=['string'])
+        expected = ('name:CEO', 'salary:100000', 'boss:True')
+
+        self.assertEqual(f(self.values), expected)
+        self.assertEqual(zip(*f.format_columns(zip(self.values))),
+                         [expected])
+
+    def test_mismatch(self):
+        f = Formatter(self.concept, formats=['string'])
+
+        self.assertRaises(TypeError, f, self.values[:2])
+
+    def test_format_columns(self):
+        f = Formatter(self.concept, formats=['number', 'string'])
+
+        rows = [self.values, ['CTO', None, False]]
+        columns = zip(*rows)
+
+        output = f.format_columns(columns)
+        self.assertEqual(zip(*output), f.format_batch(rows))
+        self.assertEqual(zip(*output), [
+            ('CEO', 100000, True),
+            ('CTO', '', False),
+        ])
+
+    def test_format_columns_override(self):
+        class NumberFormatter(Formatter):
+            def to_number(self, value, field, context):
+                return -1
+
+        f = NumberFormatter(self.concept, formats=['number'])
+
+        # The inherited column method is not used since `to_number`
+        # is overridden.
+        output = f.format_columns(zip(self.values))
+        self.assertEqual(output, [[-1], [-1], [-1]])
+
+    def test_format_columns_mismatch(self):
+        class ShortFormatter(Formatter):
+            def to_number_column(self, values, field, context):
+                return values[:-1]
+
+        f = ShortFormatter(self.concept, formats=['number'])
+
+        rows = [self.values, ['CTO', None, False]]
+
+        self.assertRaises(FormatterMismatchError, f.format_columns,
+                          zip(*rows))
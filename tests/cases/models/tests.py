@@ -1,11 +1,14 @@
+import time
 from copy import deepcopy
+from django.db import connection
 from django.test import TestCase
 from django.core import management
-from django.test.utils import override_settings
+from django.test.utils import override_settings, CaptureQueriesContext
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from guardian.shortcuts import assign
+from avocado.core.cache import incr_data_epoch
 from avocado.models import DataField, DataConcept, DataConceptField, \
     DataContext, DataView, DataQuery, DataCategory
 from ...models import Employee
@@ -80,6 +83,42 @@ class DataFieldMethodsTestCase(TestCase):
         self.assertEqual(self.budget.sparsity(), 0.5)
         self.assertEqual(self.due_date.sparsity(), 1)
 
+    def test_stats(self):
+        f = self.budget
+
+        # Detecting support for STDDEV runs queries the first time.
+        connection.features.supports_stddev
+
+        with self.assertNumQueries(1):
+            stats = f.stats()
+
+        self.assertEqual(stats['nulls'], 1)
+        self.assertEqual(stats['sparsity'], f.sparsity())
+
+        for name in ('count', 'min', 'max', 'avg', 'sum'):
+            self.assertEqual(stats[name], getattr(f, name)())
+
+        stats = self.due_date.stats()
+        self.assertEqual(stats['count'], 0)
+        self.assertEqual(stats['sparsity'], 1)
+        self.assertFalse('avg' in stats)
+
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_stats_cached(self):
+        f = self.budget
+        queryset = f.model.objects.filter(pk__gt=0)
+
+        for name in ('stats', 'min', 'max', 'sparsity'):
+            getattr(f, name).flush(f, kwargs={'queryset': queryset})
+
+        f.stats(queryset=queryset)
+
+        # The individual methods are populated.
+        with self.assertNumQueries(0):
+            f.min(queryset=queryset)
+            f.max(queryset=queryset)
+            f.sparsity(queryset=queryset)
+
 
 class DataFieldSupplementaryTestCase(TestCase):
     fixtures = ['tests/fixtures/employee_data.json']
@@ -97,6 +136,33 @@ class DataFieldSupplementaryTestCase(TestCase):
         self.assertEqual(self.f.coded_values(), None)
         self.assertEqual(self.f.coded_labels(), None)
 
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_values_not_stale(self):
+        f = self.f
+        f.save()
+
+        proxy = DataField.values.cache_proxy
+        key = proxy.cache_key(f)
+        stale_key = proxy.stale_key(f)
+
+        DataField.values.flush(f)
+        cache.set(stale_key, ('Stale',))
+        cache.add(key + ':lock', 1)
+
+        wait_timeout = proxy.wait_timeout
+        proxy.wait_timeout = 0.1
+
+        # Another process holds the lock, but values are never served
+        # stale since they are paired with the labels and codes.
+        try:
+            values = f.values()
+        finally:
+            proxy.wait_timeout = wait_timeout
+            cache.delete(key + ':lock')
+            cache.delete(stale_key)
+
+        self.assertEqual(values, tuple(f.values_list()))
+
     def test_code_field(self):
         self.f.code_field_name = 'id'
 
@@ -116,6 +182,8 @@ class DataFieldSupplementaryTestCase(TestCase):
         )
 
         # Manually set choices for test..
+        self.addCleanup(setattr, self.f.field, '_choices',
+                        self.f.field._choices)
         self.f.field._choices = choices
 
         self.assertEqual(list(self.f.values())[0], 'Programmer')
@@ -127,6 +195,40 @@ class DataFieldSupplementaryTestCase(TestCase):
         self.assertEqual(list(self.f.coded_values())[0], (0, 'Programmer'))
         self.assertEqual(list(self.f.coded_labels())[0], (0, 'Programmer'))
 
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_label_index(self):
+        cache.clear()
+        self.f.save()
+
+        index = self.f.label_index()
+        self.assertEqual(index['Analyst'], 'Analyst')
+        self.assertEqual(index, dict(self.f.value_labels()))
+
+        # Memoized until the data version changes.
+        with self.assertNumQueries(0):
+            self.assertTrue(self.f.label_index() is index)
+
+        self.f.data_version += 1
+        self.assertFalse(self.f.label_index() is index)
+
+    def test_get_labels(self):
+        f = DataField(app_name='tests', model_name='title', field_name='id',
+                      label_field_name='name')
+
+        # Only the labels of the values are fetched.
+        with self.assertNumQueries(1):
+            labels = f.get_labels([2, 3, 2, 100])
+
+        self.assertEqual(labels, {
+            2: 'Analyst',
+            3: f.model.objects.get(pk=3).name,
+            100: '100',
+        })
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.f.get_labels(['Analyst']),
+                             {'Analyst': 'Analyst'})
+
     def test_random(self):
         values = self.f.values()
         random_values = self.f.random(3)
@@ -232,6 +334,53 @@ class DataFieldQuerysetTestCase(TestCase):
             first_name__icontains='Eri')
         self.assertEqual(self.first_name.size(queryset=queryset), 3)
 
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_prefetch_cached(self):
+        cache.clear()
+
+        salary = DataField.objects.get_by_natural_key(
+            'tests', 'title', 'salary')
+        fields = [self.first_name, self.budget, salary]
+
+        # One query per field for `size` and `values` and one query per
+        # model for the aggregations.
+        with self.assertNumQueries(9):
+            output = DataField.objects.prefetch_cached(fields)
+
+        for f in fields:
+            self.assertTrue(f.size.cached(f))
+            self.assertTrue(f.values.cached(f))
+
+            self.assertEqual(output[f.pk], {
+                'size': f.size(),
+                'values': f.values(),
+                'min': f.min(),
+                'max': f.max(),
+            })
+
+        # All are cached now.
+        with self.assertNumQueries(0):
+            self.assertEqual(DataField.objects.prefetch_cached(fields),
+                             output)
+
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_prefetch_cached_single_flight(self):
+        cache.clear()
+
+        proxy = DataField.size.cache_proxy
+        key = proxy.cache_key(self.first_name)
+
+        # Another process is computing the size, so the stale size is used
+        # rather than computing it again.
+        cache.set(proxy.stale_key(self.first_name), 5)
+        cache.add(key + ':lock', 1)
+
+        with self.assertNumQueries(0):
+            output = DataField.objects.prefetch_cached([self.first_name],
+                                                       methods=['size'])
+
+        self.assertEqual(output[self.first_name.pk], {'size': 5})
+
     def test_values(self):
         values = self.first_name.values()
 
@@ -450,6 +599,66 @@ class DataContextTestCase(TestCase):
         self.assertEqual(ctx.count(), 6)
         self.assertEqual(ctx.count(tree='office'), 1)
 
+    @override_settings(AVOCADO_QUERY_COUNT_CACHE_ENABLED=True)
+    def test_count_cached(self):
+        cache.clear()
+
+        json = {
+            'field': 'tests.title.salary',
+            'operator': 'gt',
+            'value': '10000'
+        }
+
+        def count_queries(ctx):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(ctx.count(), 6)
+
+            return len([q for q in queries.captured_queries
+                        if 'COUNT' in q['sql']])
+
+        self.assertEqual(count_queries(DataContext(json)), 1)
+
+        # Equivalent contexts share the count.
+        ctx = DataContext(deepcopy(json), name='Salaries')
+        ctx.save()
+        self.assertEqual(count_queries(ctx), 0)
+
+        # Changes other than the query do not invalidate it.
+        ctx.name = 'High salaries'
+        ctx.save()
+        self.assertEqual(count_queries(ctx), 0)
+
+        incr_data_epoch()
+        self.assertEqual(count_queries(ctx), 1)
+
+    @override_settings(AVOCADO_QUERY_COUNT_CACHE_ENABLED=True,
+                       AVOCADO_QUERY_COUNT_CACHE_TIMEOUT=1)
+    def test_count_cached_stale(self):
+        cache.clear()
+
+        ctx = DataContext({
+            'field': 'tests.title.salary',
+            'operator': 'gt',
+            'value': '10000'
+        })
+
+        self.assertEqual(ctx.count(), 6)
+
+        Employee.objects.filter(title__salary__gt=10000)[0].delete()
+
+        # Changes to the data are not reflected until the data epoch is
+        # incremented, e.g. by `avocado data --incr`, or the count expires.
+        self.assertEqual(ctx.count(), 6)
+
+        incr_data_epoch()
+        self.assertEqual(ctx.count(), 5)
+
+        Employee.objects.filter(title__salary__gt=10000)[0].delete()
+        self.assertEqual(ctx.count(), 5)
+
+        time.sleep(1.1)
+        self.assertEqual(ctx.count(), 4)
+
 
 class DataViewTestCase(TestCase):
     def test_init(self):
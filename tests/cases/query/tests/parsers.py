@@ -1,9 +1,13 @@
 from copy import deepcopy
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.core.exceptions import ValidationError
 from django.core import management
 from avocado.query import oldparsers as parsers
-from avocado.models import DataConcept, DataField, DataConceptField
+from avocado.models import DataConcept, DataField, DataConceptField, \
+    DataContext
 from ....models import Employee
 
 
@@ -175,6 +179,60 @@ class DataContextParserTestCase(TestCase):
 
         self.assertFalse(attrs['enabled'])
 
+    def test_bulk_resolve(self):
+        salary = DataField.objects.get_by_natural_key('tests.title.salary')
+        c = DataConcept()
+        c.save()
+        DataConceptField(concept=c, field=salary).save()
+
+        attrs = {
+            'type': 'and',
+            'children': [{
+                'field': 'tests.title.name',
+                'operator': 'exact',
+                'value': 'CEO',
+            }, {
+                'field': 'tests.employee.first_name',
+                'operator': 'exact',
+                'value': 'Eric',
+            }, {
+                'type': 'or',
+                'children': [{
+                    'field': salary.pk,
+                    'operator': 'gt',
+                    'value': 10000,
+                }, {
+                    'concept': c.pk,
+                    'field': 'tests.title.salary',
+                    'operator': 'lt',
+                    'value': 1000,
+                }]
+            }]
+        }
+
+        # One query each for the fields, concepts and concept fields.
+        with self.assertNumQueries(3):
+            node = parsers.datacontext.parse(deepcopy(attrs), tree=Employee)
+
+        with self.assertNumQueries(0):
+            fields = [n.field for n in node.children[:2]] + \
+                [n.field for n in node.children[2].children]
+
+        self.assertEqual([f.field_name for f in fields],
+                         ['name', 'first_name', 'salary', 'salary'])
+
+        # Only the data queries of the translators remain.
+        with CaptureQueriesContext(connection) as queries:
+            parsers.datacontext.validate(deepcopy(attrs), tree=Employee)
+
+        self.assertEqual(len([q for q in queries.captured_queries
+                              if 'avocado_' in q['sql']]), 3)
+
+        # Fields not in the concept are not resolved.
+        attrs['children'][2]['children'][1]['field'] = 'tests.title.name'
+        attrs = parsers.datacontext.validate(attrs, tree=Employee)
+        self.assertFalse(attrs['children'][2]['children'][1]['enabled'])
+
     def test_parsed_node(self):
         node = parsers.datacontext.parse({
             'type': 'and',
@@ -197,6 +255,72 @@ class DataContextParserTestCase(TestCase):
         self.assertEqual(str(node.condition),
                          "(AND: ('title__name__exact', u'CEO'))")
 
+    def test_cached_parse(self):
+        attrs = {
+            'type': 'and',
+            'children': [{
+                'field': 'tests.title.name',
+                'operator': 'exact',
+                'value': 'CEO',
+            }]
+        }
+
+        node = parsers.datacontext.cached_parse(deepcopy(attrs),
+                                                tree=Employee)
+        node.apply()
+
+        # Only the versions of the referenced fields are queried.
+        with self.assertNumQueries(1):
+            cached = parsers.datacontext.cached_parse(deepcopy(attrs),
+                                                      tree=Employee)
+            cached.apply()
+
+        self.assertTrue(cached is node)
+
+        # Different trees do not share nodes.
+        self.assertFalse(
+            parsers.datacontext.cached_parse(deepcopy(attrs), tree='title')
+            is node)
+
+        # Changing the field invalidates the node.
+        field = DataField.objects.get_by_natural_key('tests.title.name')
+        field.save()
+
+        node = parsers.datacontext.cached_parse(deepcopy(attrs),
+                                                tree=Employee)
+
+        # Incrementing the data version, which does not change the modified
+        # time, invalidates the node.
+        DataField.objects.filter(pk=field.pk).update(
+            data_version=F('data_version') + 1)
+
+        self.assertFalse(parsers.datacontext.cached_parse(
+            deepcopy(attrs), tree=Employee) is node)
+
+        # Composites are not cached.
+        attrs = {'composite': 1}
+        self.assertRaises(DataContext.DoesNotExist,
+                          parsers.datacontext.cached_parse, attrs)
+
+    @override_settings(AVOCADO_QUERY_PARSE_CACHE_SIZE=0)
+    def test_cached_parse_disabled(self):
+        attrs = {
+            'field': 'tests.title.name',
+            'operator': 'exact',
+            'value': 'CEO',
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            parsers.datacontext.parse(deepcopy(attrs), tree=Employee)
+
+        # The versions are not queried if the cache is disabled.
+        with self.assertNumQueries(len(queries)):
+            node = parsers.datacontext.cached_parse(deepcopy(attrs),
+                                                    tree=Employee)
+
+        self.assertFalse(parsers.datacontext.cached_parse(
+            deepcopy(attrs), tree=Employee) is node)
+
     def test_apply(self):
         f = DataField.objects.get_by_natural_key('tests',
                                                  'title',
@@ -353,6 +477,36 @@ class DataViewParserTestCase(TestCase):
             '"tests_employee"."last_name" DESC'
             .replace(' ', ''))
 
+    def test_cached_parse(self):
+        facets = [{'concept': self.c.pk, 'sort': 'desc'}]
+
+        node = parsers.dataview.cached_parse(deepcopy(facets), tree=Employee)
+        node.apply()
+
+        # Only the versions of the referenced concepts are queried.
+        with self.assertNumQueries(1):
+            cached = parsers.dataview.cached_parse(deepcopy(facets),
+                                                   tree=Employee)
+            cached.apply()
+
+        self.assertTrue(cached is node)
+
+        # Changing the concept fields invalidates the node.
+        f = DataField.objects.get_by_natural_key('tests.title.name')
+        DataConceptField(concept=self.c, field=f).save()
+
+        self.assertFalse(parsers.dataview.cached_parse(
+            deepcopy(facets), tree=Employee) is node)
+
+        node = parsers.dataview.cached_parse(deepcopy(facets), tree=Employee)
+
+        # Incrementing the data version of a field invalidates the node.
+        DataField.objects.filter(pk=f.pk).update(
+            data_version=F('data_version') + 1)
+
+        self.assertFalse(parsers.dataview.cached_parse(
+            deepcopy(facets), tree=Employee) is node)
+
     def test_apply_distinct(self):
         node = parsers.dataview.parse([{
             'concept': self.c.pk,
@@ -1,5 +1,6 @@
 from django.core import management
 from django.test import TestCase
+from avocado.query import utils
 from avocado.query.pipeline import QueryProcessor
 from avocado.models import DataConcept, DataView
 from tests.models import Employee
@@ -45,3 +46,48 @@ class QueryProcessorTestCase(TestCase):
         i = p.get_iterable(queryset=q)
 
         self.assertEqual(len(list(i)), 0)
+
+    def test_stream(self):
+        p = QueryProcessor(view=self.v, tree=Employee)
+        q = p.get_queryset()
+
+        rows = list(p.get_iterable(queryset=q))
+        streamed = list(p.get_iterable(queryset=q, stream=True, fetch_size=4))
+
+        self.assertEqual(streamed, rows)
+
+    def test_stream_unsupported(self):
+        p = QueryProcessor(view=self.v, tree=Employee)
+        q = p.get_queryset()
+
+        rows = list(p.get_iterable(queryset=q))
+
+        # Older versions of Django fall back to fetching rows as usual.
+        supported = utils.SUPPORTS_STREAMING
+        utils.SUPPORTS_STREAMING = False
+
+        try:
+            streamed = list(p.get_iterable(queryset=q, stream=True))
+        finally:
+            utils.SUPPORTS_STREAMING = supported
+
+        self.assertEqual(streamed, rows)
+
+    def test_stream_slice(self):
+        p = QueryProcessor(view=self.v, tree=Employee)
+        q = p.get_queryset()
+
+        rows = list(p.get_iterable(queryset=q, offset=2, limit=3))
+        streamed = list(p.get_iterable(queryset=q, offset=2, limit=3,
+                                       stream=True, fetch_size=2))
+
+        self.assertEqual(len(streamed), 3)
+        self.assertEqual(streamed, rows)
+
+    def test_stream_none(self):
+        p = QueryProcessor(view=self.v, tree=Employee)
+        q = p.get_queryset().none()
+
+        i = p.get_iterable(queryset=q, stream=True)
+
+        self.assertEqual(len(list(i)), 0)
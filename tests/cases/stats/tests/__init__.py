@@ -1,2 +1,3 @@
 from .agg import *      # noqa
 from .kmeans import *   # noqa
+from .histogram import *  # noqa
@@ -5,6 +5,7 @@ from django.test.utils import override_settings
 from django.core import management
 from django.db import DatabaseError
 from avocado.models import DataField
+from avocado.stats.agg import Aggregator
 
 
 class AggregatorTestCase(TestCase):
@@ -166,3 +167,37 @@ class AggregatorTestCase(TestCase):
             self.assertRaises(DatabaseError, self.is_manager.variance())
             self.assertRaises(DatabaseError, self.salary.variance)
             self.assertRaises(DatabaseError, self.first_name.variance())
+
+    def test_groupby_slicing(self):
+        agg = Aggregator(self.first_name.field).groupby('first_name')\
+            .order_by('first_name')
+
+        # Counted and sliced in the database.
+        with self.assertNumQueries(1):
+            self.assertEqual(len(agg), 6)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(agg[:2], [
+                {'values': [u'Aaron']},
+                {'values': [u'Eric']},
+            ])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(agg[5], {'values': [u'Zac']})
+
+        # Negative indexes evaluate the results.
+        self.assertEqual(agg[-1], {'values': [u'Zac']})
+
+    def test_iterator(self):
+        agg = Aggregator(self.first_name.field).groupby('first_name')
+
+        self.assertEqual(len(list(agg.iterator())), 6)
+        self.assertFalse(hasattr(agg, '_result_cache'))
+
+        self.assertEqual(len(list(agg)), 6)
+        self.assertTrue(hasattr(agg, '_result_cache'))
+
+        # Served from the result cache.
+        with self.assertNumQueries(0):
+            self.assertEqual(len(agg), 6)
+            self.assertEqual(agg[0], list(agg)[0])
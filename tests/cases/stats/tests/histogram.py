@@ -0,0 +1,54 @@
+from django.test import TestCase
+from django.core import management
+from avocado.models import DataField
+from avocado.stats.histogram import histogram
+from ....models import Title
+
+
+class HistogramTestCase(TestCase):
+    fixtures = ['tests/fixtures/employee_data.json']
+
+    def setUp(self):
+        management.call_command('avocado', 'init', 'tests', quiet=True)
+        self.salary = DataField.objects\
+            .get_by_natural_key('tests', 'title', 'salary')
+
+    def test_width(self):
+        self.assertEqual(self.salary.histogram(bins=4), {
+            'edges': [10000, 57500, 105000, 152500, 200000],
+            'counts': [5, 1, 0, 1],
+        })
+
+    def test_quantiles(self):
+        self.assertEqual(self.salary.histogram(bins=2, quantiles=True), {
+            'edges': [10000, 15000, 200000],
+            'counts': [1, 6],
+        })
+
+    def test_queryset(self):
+        queryset = Title.objects.filter(salary__lt=20000)
+
+        self.assertEqual(self.salary.histogram(bins=2, queryset=queryset), {
+            'edges': [10000, 12500, 15000],
+            'counts': [1, 3],
+        })
+
+        # A single distinct value.
+        queryset = Title.objects.filter(salary=15000)
+
+        self.assertEqual(histogram(queryset, 'salary', bins=3), {
+            'edges': [15000, 15000],
+            'counts': [3],
+        })
+
+    def test_empty(self):
+        queryset = Title.objects.none()
+
+        self.assertEqual(histogram(queryset, 'salary'),
+                         {'edges': [], 'counts': []})
+        self.assertEqual(histogram(queryset, 'salary', quantiles=True),
+                         {'edges': [], 'counts': []})
+
+    def test_non_numeric(self):
+        name = DataField.objects.get_by_natural_key('tests', 'title', 'name')
+        self.assertEqual(name.histogram(), None)
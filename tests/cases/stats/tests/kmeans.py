@@ -1,8 +1,14 @@
 import os
+import sys
+import time
+import random
+import unittest
 from django.test import TestCase
+from avocado.conf import dep_supported
 from avocado.stats import kmeans
+from tests.models import Title
 
-__all__ = ('KmeansTestCase',)
+__all__ = ('KmeansTestCase', 'KmeansNumpyTestCase', 'KmeansBenchmarkTestCase')
 
 random_points_file = open(os.path.join(
     os.path.dirname(__file__), '../../../fixtures/random_points/points.txt'))
@@ -327,3 +333,156 @@ class KmeansTestCase(TestCase):
         centroid_counts, _ = kmeans.weighted_counts(int_points, counts, 3)
         m_counts = [c['count'] for c in centroid_counts]
         self.assertSequenceEqual(expected_counts, m_counts)
+
+    def test_minibatch_kmeans(self):
+        clean_points = [p for p in int_points_3d if 100 not in p]
+
+        random.seed(1)
+        result = kmeans.minibatch_kmeans(clean_points, 3, batch_size=50)
+
+        self.assertEqual(len(result['indexes']), len(clean_points))
+        self.assertEqual(sum(result['counts']), len(clean_points))
+
+        for i, count in enumerate(result['counts']):
+            self.assertEqual(result['indexes'].count(i), count)
+
+        # With a single centroid, the running mean is the mean of all points.
+        result = kmeans.minibatch_kmeans(clean_points, 1, batch_size=7)
+        mean = [sum(d) / float(len(clean_points)) for d in zip(*clean_points)]
+
+        self.assertSequenceAlmostEqual(result['centroids'][0], mean)
+        self.assertEqual(result['counts'], [len(clean_points)])
+        self.assertEqual(result['indexes'], [0] * len(clean_points))
+
+        # Points from an iterator can only be read once.
+        result = kmeans.minibatch_kmeans(iter(random_points), 4,
+                                         batch_size=100, assign=False)
+        self.assertEqual(len(result['centroids']), 4)
+        self.assertEqual(sum(result['counts']), len(random_points))
+        self.assertEqual(result['indexes'], None)
+
+        self.assertRaises(ValueError, kmeans.minibatch_kmeans,
+                          iter(random_points), 4)
+        self.assertRaises(ValueError, kmeans.minibatch_kmeans, [], 3)
+        self.assertRaises(ValueError, kmeans.minibatch_kmeans,
+                          random_points, 0)
+
+    def test_minibatch_kmeans_queryset(self):
+        for i, x in enumerate(random_points[:50]):
+            Title(name=str(i), salary=int(x * 1000)).save()
+
+        queryset = Title.objects.values_list('salary', 'id')
+
+        for func in (kmeans.minibatch_kmeans,
+                     kmeans.minibatch_kmeans.python):
+            result = func(queryset, 3, batch_size=20)
+            self.assertEqual(len(result['indexes']), 50)
+            self.assertEqual(sum(result['counts']), 50)
+
+            # Each pass reads the rows using iterator(), so they are not
+            # cached on the QuerySet.
+            self.assertEqual(queryset._result_cache, None)
+
+        # A callable returns a new iterator for each pass.
+        result = kmeans.minibatch_kmeans(lambda: queryset.iterator(), 3,
+                                         batch_size=20)
+        self.assertEqual(len(result['indexes']), 50)
+
+
+@unittest.skipUnless(dep_supported('numpy'), 'NumPy is not installed')
+class KmeansNumpyTestCase(TestCase):
+    "Checks the NumPy implementations against the pure-Python ones."
+    def assertClose(self, a, b):
+        if kmeans.is_iterable(a):
+            self.assertEqual(len(a), len(b))
+            for x, y in zip(a, b):
+                self.assertClose(x, y)
+        else:
+            self.assertAlmostEqual(a, b, places=PLACES)
+
+    def test_normalize(self):
+        for points in (random_points, random_points_3d, [[1, 1, i] for i
+                                                         in range(1, 100)]):
+            self.assertClose(kmeans.normalize(points),
+                             kmeans.normalize.python(points))
+
+    def test_compute_clusters(self):
+        book = random_points_3d[:8]
+
+        self.assertEqual(kmeans.compute_clusters(random_points_3d, book),
+                         kmeans.compute_clusters.python(random_points_3d,
+                                                        book))
+
+    def test_kmeans_optm(self):
+        for points in (random_points, random_points_3d, int_points_3d):
+            kmeans.USE_NUMPY = False
+
+            try:
+                expected = kmeans.kmeans_optm(points)
+            finally:
+                kmeans.USE_NUMPY = True
+
+            result = kmeans.kmeans_optm(points)
+
+            self.assertEqual(result['indexes'], expected['indexes'])
+            self.assertEqual(result['outliers'], expected['outliers'])
+            self.assertClose(result['centroids'], expected['centroids'])
+            self.assertClose(result['distances'], expected['distances'])
+
+    def test_minibatch_kmeans(self):
+        for points in (random_points, random_points_3d):
+            kmeans.USE_NUMPY = False
+
+            try:
+                random.seed(0)
+                expected = kmeans.minibatch_kmeans(points, 8, batch_size=64)
+            finally:
+                kmeans.USE_NUMPY = True
+
+            random.seed(0)
+            result = kmeans.minibatch_kmeans(points, 8, batch_size=64)
+
+            self.assertEqual(result['indexes'], expected['indexes'])
+            self.assertEqual(result['counts'], expected['counts'])
+            self.assertClose(result['centroids'], expected['centroids'])
+            self.assertClose(result['distances'], expected['distances'])
+
+
+@unittest.skipUnless(dep_supported('numpy') and
+                     os.environ.get('AVOCADO_BENCHMARK'),
+                     'Set AVOCADO_BENCHMARK=1 to run benchmarks')
+class KmeansBenchmarkTestCase(TestCase):
+    """Compares the pure-Python and NumPy implementations. Clustering 1M
+    points with the pure-Python k-means takes over ten minutes, so only the
+    cluster assignment step is compared at that size.
+    """
+    def timeit(self, func, use_numpy):
+        kmeans.USE_NUMPY = use_numpy
+        start = time.time()
+
+        try:
+            func()
+        finally:
+            kmeans.USE_NUMPY = True
+
+        return time.time() - start
+
+    def test(self):
+        rand = random.Random(0)
+
+        for n in (10000, 100000, 1000000):
+            points = [[rand.random(), rand.random()] for _ in xrange(n)]
+            centroids = points[:8]
+
+            funcs = [('compute_clusters',
+                      lambda: kmeans.compute_clusters(points, centroids))]
+
+            if n <= 100000:
+                funcs.append(('kmeans',
+                              lambda: kmeans.kmeans(points, centroids)))
+
+            for name, func in funcs:
+                sys.stderr.write('\n{0} ({1} points): python {2:.2f}s, '
+                                 'numpy {3:.2f}s '.format(
+                                     name, n, self.timeit(func, False),
+                                     self.timeit(func, True)))
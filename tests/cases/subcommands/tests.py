@@ -1,13 +1,15 @@
 import os
 import sys
+import shutil
+import tempfile
 import django
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.core import management
 from django.core.management.base import CommandError
 from django.test.utils import override_settings
 from avocado.models import DataField, DataConcept, DataCategory
 
-__all__ = ('CommandsTestCase',)
+__all__ = ('CommandsTestCase', 'CacheWorkersTestCase')
 
 
 class CommandsTestCase(TestCase):
@@ -59,6 +61,31 @@ class CommandsTestCase(TestCase):
             self.assertRaises(CommandError, management.call_command, 'avocado',
                               'cache', 'tests', methods=['invalid_function'])
 
+    @override_settings(AVOCADO_DATA_CACHE_ENABLED=True)
+    def test_cache_checkpoint(self):
+        management.call_command('avocado', 'init', 'tests', quiet=True)
+
+        f = DataField.objects.get_by_natural_key('tests', 'title', 'name')
+        f.size.flush(f)
+        f.values.flush(f)
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+
+        # `size` is recorded as complete, so it is skipped.
+        with open(path, 'w') as checkpoint:
+            checkpoint.write('{0}:size\n'.format(f.pk))
+
+        management.call_command('avocado', 'cache', 'tests.title.name',
+                                methods=['size', 'values'],
+                                checkpoint=path)
+
+        self.assertFalse(f.size.cached(f))
+        self.assertTrue(f.values.cached(f))
+
+        # Removed after a complete run.
+        self.assertFalse(os.path.exists(path))
+
     def test_init(self):
         management.call_command('avocado', 'init', 'tests', quiet=True)
 
@@ -82,3 +109,46 @@ class CommandsTestCase(TestCase):
         fields = DataField.objects.filter(published=False)
         self.assertEqual(fields.count(), 12)
         self.assertEqual(DataConcept.objects.count(), 0)
+
+
+class CacheWorkersTestCase(TransactionTestCase):
+    # The worker processes open their own connections, so the data must be
+    # committed for them to see it.
+    fixtures = ['tests/fixtures/employee_data.json']
+
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+        # The workers must share the cache with the test process.
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache_workers(self):
+        management.call_command('avocado', 'init', 'tests', quiet=True)
+
+        caches = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': self.cache_dir,
+            }
+        }
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+
+        with self.settings(CACHES=caches, AVOCADO_DATA_CACHE_ENABLED=True):
+            management.call_command('avocado', 'cache', 'tests.title',
+                                    methods=['size', 'values'], workers=2,
+                                    checkpoint=path)
+
+            for f in DataField.objects.filter(model_name='title'):
+                self.assertTrue(f.size.cached(f))
+                self.assertTrue(f.values.cached(f))
+
+        # Removed since every task completed without errors.
+        self.assertFalse(os.path.exists(path))